@@ -0,0 +1,61 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+# Events recorded by this process and not yet written
+_buffer = []
+_buffer_lock = threading.Lock()
+
+
+def record_event(request, action, target_type, target_id=None, **changes):
+    """
+    Buffer an audit event for a change made by the request's user.
+    Nothing is written here: the buffer is flushed once the response has
+    been sent (on request_finished), or as soon as AUDIT_BUFFER_SIZE events
+    are waiting.
+    """
+    user = request.user
+    event = AuditEvent(
+        actor_id=user.pk if user.is_authenticated else None,
+        action=action,
+        target_type=target_type,
+        target_id=target_id,
+        changes=changes,
+        ip_address=request.META.get('REMOTE_ADDR') or None,
+    )
+    with _buffer_lock:
+        _buffer.append(event)
+        full = len(_buffer) >= getattr(settings, 'AUDIT_BUFFER_SIZE', 500)
+    if full:
+        flush_events()
+
+
+def flush_events():
+    """
+    Write the buffered events with a single bulk insert and return how many
+    were written. Events that cannot be written are kept for the next flush.
+    """
+    with _buffer_lock:
+        if not _buffer:
+            return 0
+        events = _buffer[:]
+        _buffer.clear()
+    try:
+        AuditEvent.objects.bulk_create(events)
+    except DatabaseError:
+        logger.exception('Could not write %d audit events', len(events))
+        with _buffer_lock:
+            _buffer[:0] = events
+        return 0
+    return len(events)
+
+
+# Write what is left when the process exits
+atexit.register(flush_events)
@@ -0,0 +1,65 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    Run the enclosed block against a freshly migrated throwaway database.
+    Uses the same machinery (and TEST settings) as the test runner, so
+    benchmarks never touch the configured database.
+    """
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+
+
+def measure(func, iterations, warmup=10):
+    """
+    Call func repeatedly and return latency statistics in milliseconds.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings, time.perf_counter() - started)
+
+
+def summarize(timings, elapsed):
+    """
+    Summarize latencies (in milliseconds) measured over elapsed seconds.
+    """
+    timings = sorted(timings)
+    return {
+        'count': len(timings),
+        'throughput': len(timings) / elapsed if elapsed else 0.0,
+        'mean': statistics.fmean(timings),
+        'p50': percentile(timings, 50),
+        'p99': percentile(timings, 99),
+    }
+
+
+def percentile(sorted_values, percent):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def format_stats(name, stats):
+    return (
+        f"{name:<40} {stats['throughput']:>10.1f} req/s "
+        f"p50 {stats['p50']:>8.3f} ms  p99 {stats['p99']:>8.3f} ms"
+    )
@@ -0,0 +1,401 @@
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Aggregate, CharField, F, Value
+
+from .authentication import revoke_user_tokens
+from .conditional import touch_users
+from .permission_matrix import refresh_effective_permissions, refresh_users
+from .roles import invalidate_all_roles
+from .serializers import UserImportRowSerializer
+
+# Get the User model
+User = get_user_model()
+
+# Through models backing CustomUser.groups and Group.permissions
+Membership = User.groups.through
+GroupPermission = Group.permissions.through
+
+FILE_FORMATS = ('csv', 'ndjson')
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 5000
+
+EXPORT_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'phone_number',
+    'is_active', 'is_staff', 'is_verified', 'date_joined', 'last_login',
+)
+EXPORT_CHUNK_SIZE = 2000
+
+# Joins group names inside the database; a control character cannot clash with real names
+GROUP_SEPARATOR = '\x1f'
+
+
+class GroupConcat(Aggregate):
+    """
+    Concatenate the values of a column across the grouped rows.
+    Maps to GROUP_CONCAT on SQLite/MySQL and STRING_AGG on PostgreSQL.
+    """
+    function = 'GROUP_CONCAT'
+    output_field = CharField()
+
+    def __init__(self, expression, separator, **extra):
+        super().__init__(expression, Value(separator), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='STRING_AGG', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template='%(function)s(%(expressions)s)',
+            arg_joiner=' SEPARATOR ', **extra_context
+        )
+
+
+def get_file_format(upload, file_format=None):
+    """
+    Resolve the format of an uploaded file from the explicit format or its extension.
+    Returns None when the format cannot be determined.
+    """
+    if file_format:
+        file_format = file_format.lower()
+    else:
+        file_format = upload.name.rsplit('.', 1)[-1].lower() if '.' in upload.name else None
+        if file_format in ('jsonl', 'json'):
+            file_format = 'ndjson'
+    return file_format if file_format in FILE_FORMATS else None
+
+
+def iter_import_rows(upload, file_format):
+    """
+    Yield (row_number, data) pairs from an uploaded CSV or NDJSON file.
+    The file is read line by line, so large uploads are never held in memory.
+    Rows that cannot be decoded or parsed yield (row_number, None).
+    """
+    lines = _decode_lines(upload)
+    if file_format == 'csv':
+        undecodable = []
+        reader = csv.DictReader(_skip_undecodable(lines, undecodable))
+        while True:
+            try:
+                data = next(reader)
+            except StopIteration:
+                break
+            except csv.Error:
+                data = None
+            else:
+                # Group ids are written as "1;2;3" in CSV files
+                group_ids = data.get('group_ids')
+                if group_ids is not None:
+                    data['group_ids'] = [value for value in group_ids.split(';') if value.strip()]
+            while undecodable:
+                yield undecodable.pop(0), None
+            yield reader.line_num, data
+        for row_number in undecodable:
+            yield row_number, None
+    else:
+        for row_number, line in enumerate(lines, start=1):
+            if line is None:
+                yield row_number, None
+                continue
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                data = None
+            yield row_number, data if isinstance(data, dict) else None
+
+
+def _decode_lines(upload):
+    """
+    Yield the lines of an upload decoded as UTF-8, or None for the lines
+    that are not valid UTF-8.
+    """
+    encoding = 'utf-8-sig'
+    for line in upload:
+        try:
+            yield line.decode(encoding)
+        except UnicodeDecodeError:
+            yield None
+        # Only the first line may start with a byte order mark
+        encoding = 'utf-8'
+
+
+def _skip_undecodable(lines, undecodable):
+    # Undecodable lines are replaced by empty ones, which the CSV reader skips
+    for line_number, line in enumerate(lines, start=1):
+        if line is None:
+            undecodable.append(line_number)
+            line = ''
+        yield line
+
+
+def import_users(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Create users from (row_number, data) pairs.
+    Rows are validated and inserted chunk by chunk, each chunk with one
+    bulk insert for users and one for their group memberships.
+    Returns a report with the number of created users and per-row errors.
+    """
+    report = {'created': 0, 'failed': 0, 'errors': []}
+    group_ids = set(Group.objects.values_list('pk', flat=True))
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(chunk, group_ids, report)
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
+
+
+def _import_chunk(chunk, group_ids, report):
+    valid = []
+    seen = set()
+    for row_number, data in chunk:
+        if data is None:
+            _add_error(report, row_number, {'non_field_errors': ['Malformed row.']})
+            continue
+        serializer = UserImportRowSerializer(data=data)
+        if not serializer.is_valid():
+            _add_error(report, row_number, serializer.errors)
+            continue
+        row = serializer.validated_data
+        unknown = set(row.get('group_ids', [])) - group_ids
+        if unknown:
+            _add_error(report, row_number, {'group_ids': [f'Unknown group ids: {sorted(unknown)}']})
+        elif row['username'] in seen:
+            _add_error(report, row_number, {'username': ['Duplicate username in upload.']})
+        else:
+            seen.add(row['username'])
+            valid.append((row_number, row))
+
+    existing = set(User.objects.filter(username__in=seen).values_list('username', flat=True))
+    rows = []
+    for row_number, row in valid:
+        if row['username'] in existing:
+            _add_error(report, row_number, {'username': ['A user with that username already exists.']})
+        else:
+            rows.append((row_number, row))
+    if not rows:
+        return
+
+    users = [_build_user(row) for _, row in rows]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            if any(user.pk is None for user in users):
+                # Backends without RETURNING support do not set primary keys
+                pks = dict(User.objects.filter(
+                    username__in=[user.username for user in users]
+                ).values_list('username', 'pk'))
+                for user in users:
+                    user.pk = pks[user.username]
+            memberships = Membership.objects.bulk_create([
+                Membership(customuser_id=user.pk, group_id=group_id)
+                for user, (_, row) in zip(users, rows)
+                for group_id in row.get('group_ids', [])
+            ], ignore_conflicts=True)
+            if memberships:
+                refresh_effective_permissions(User.objects.filter(pk__in=[user.pk for user in users]))
+    except IntegrityError:
+        # A concurrent request created one of the users; report the whole chunk
+        for row_number, _ in rows:
+            _add_error(report, row_number, {'non_field_errors': ['Row conflicts with existing data.']})
+        return
+    report['created'] += len(users)
+
+
+def _build_user(row):
+    """
+    Build an unsaved user from a validated row.
+    Pre-hashed passwords are stored as is; rows without a password get an
+    unusable one, so the user sets it through the password reset flow.
+    """
+    if row.get('password_hash'):
+        password = row['password_hash']
+    else:
+        password = make_password(row.get('password') or None)
+    return User(
+        username=row['username'],
+        email=User.objects.normalize_email(row.get('email', '')),
+        first_name=row.get('first_name', ''),
+        last_name=row.get('last_name', ''),
+        phone_number=row.get('phone_number') or None,
+        password=password,
+    )
+
+
+def assign_groups(users, group_ids, mode='add'):
+    """
+    Add, remove or replace the groups of every user in the queryset.
+    Runs a fixed number of set-based statements on the membership table in
+    one transaction, whatever the number of users. Bypasses the m2m signals,
+    so effective permissions, updated_at, cached roles and the users' tokens,
+    which carry their roles, are dealt with here.
+    Returns the membership counts.
+    """
+    user_ids = users.order_by().values('pk')
+    added = removed = 0
+    with transaction.atomic():
+        # Fetched up front, since a filter on groups may stop matching once they change
+        affected = list(user_ids.values_list('pk', flat=True))
+        # Insert before deleting: users selected by group membership keep
+        # matching until their old memberships are gone
+        if mode in ('add', 'replace') and group_ids:
+            added = _insert_memberships(user_ids, group_ids)
+        if mode in ('remove', 'replace'):
+            memberships = Membership.objects.filter(customuser_id__in=user_ids)
+            if mode == 'remove':
+                memberships = memberships.filter(group_id__in=group_ids)
+            else:
+                memberships = memberships.exclude(group_id__in=group_ids)
+            removed, _ = memberships.delete()
+        if added or removed:
+            refresh_users(affected)
+            touch_users(affected)
+            revoke_user_tokens(*affected)
+    if added or removed:
+        invalidate_all_roles()
+    return {'added': added, 'removed': removed}
+
+
+def _insert_memberships(user_ids, group_ids):
+    """
+    Insert every missing (user, group) pair with a single INSERT ... SELECT.
+    """
+    qn = connection.ops.quote_name
+    membership = qn(Membership._meta.db_table)
+    user_column = qn(User.groups.field.m2m_column_name())
+    group_column = qn(User.groups.field.m2m_reverse_name())
+    # Aliased, since SQLite does not name a derived table's columns after the source column
+    users_sql, users_params = user_ids.values(user_id=F('pk')).query.sql_with_params()
+    placeholders = ', '.join(['%s'] * len(group_ids))
+    sql = (
+        f'INSERT INTO {membership} ({user_column}, {group_column}) '
+        f'SELECT u.{qn("user_id")}, g.{qn("id")} FROM ({users_sql}) u, {qn(Group._meta.db_table)} g '
+        f'WHERE g.{qn("id")} IN ({placeholders}) AND NOT EXISTS ('
+        f'SELECT 1 FROM {membership} m WHERE m.{user_column} = u.{qn("user_id")} '
+        f'AND m.{group_column} = g.{qn("id")})'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*users_params, *group_ids))
+        return cursor.rowcount
+
+
+def update_group_permissions(group_ids, add=(), remove=(), replace=False):
+    """
+    Grant the permissions in add to every group and revoke those in remove,
+    or, with replace, every permission not in add.
+    Runs one INSERT ... SELECT and one DELETE in one transaction, whatever
+    the number of groups and permissions. Bypasses the m2m signals, so the
+    effective permissions of the members and cached roles are updated here.
+    Returns the grant counts.
+    """
+    added = removed = 0
+    with transaction.atomic():
+        if add:
+            added = _insert_group_permissions(group_ids, add)
+        if remove or replace:
+            grants = GroupPermission.objects.filter(group_id__in=group_ids)
+            if replace:
+                grants = grants.exclude(permission_id__in=add)
+            else:
+                grants = grants.filter(permission_id__in=remove)
+            removed, _ = grants.delete()
+        if added or removed:
+            refresh_effective_permissions(User.objects.filter(groups__in=group_ids))
+    if added or removed:
+        invalidate_all_roles()
+    return {'added': added, 'removed': removed}
+
+
+def _insert_group_permissions(group_ids, permission_ids):
+    """
+    Insert every missing (group, permission) pair with a single INSERT ... SELECT.
+    """
+    qn = connection.ops.quote_name
+    grants = qn(GroupPermission._meta.db_table)
+    group_column = qn(Group.permissions.field.m2m_column_name())
+    permission_column = qn(Group.permissions.field.m2m_reverse_name())
+    group_placeholders = ', '.join(['%s'] * len(group_ids))
+    permission_placeholders = ', '.join(['%s'] * len(permission_ids))
+    sql = (
+        f'INSERT INTO {grants} ({group_column}, {permission_column}) '
+        f'SELECT g.{qn("id")}, p.{qn("id")} FROM {qn(Group._meta.db_table)} g, {qn(Permission._meta.db_table)} p '
+        f'WHERE g.{qn("id")} IN ({group_placeholders}) AND p.{qn("id")} IN ({permission_placeholders}) '
+        f'AND NOT EXISTS (SELECT 1 FROM {grants} gp WHERE gp.{group_column} = g.{qn("id")} '
+        f'AND gp.{permission_column} = p.{qn("id")})'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*group_ids, *permission_ids))
+        return cursor.rowcount
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one dict per user with their group names.
+    Group names are aggregated in the same query and rows are fetched with a
+    server-side cursor where supported, so memory stays flat.
+    """
+    rows = queryset.order_by('pk').annotate(
+        group_names=GroupConcat('groups__name', GROUP_SEPARATOR)
+    ).values_list(*EXPORT_FIELDS, 'group_names')
+    for row in rows.iterator(chunk_size=chunk_size):
+        data = dict(zip(EXPORT_FIELDS, row))
+        data['groups'] = sorted(row[-1].split(GROUP_SEPARATOR)) if row[-1] else []
+        yield data
+
+
+def encode_csv(rows):
+    """
+    Encode export rows as CSV lines, header first.
+    Group names are joined with ";" like the import format.
+    """
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    yield writer.writerow(EXPORT_FIELDS + ('groups',))
+    for data in rows:
+        values = [_csv_value(data[field]) for field in EXPORT_FIELDS]
+        yield writer.writerow(values + [';'.join(data['groups'])])
+
+
+def encode_ndjson(rows):
+    """
+    Encode export rows as newline-delimited JSON.
+    """
+    for data in rows:
+        yield json.dumps(data, cls=DjangoJSONEncoder) + '\n'
+
+
+EXPORT_ENCODERS = {
+    'csv': (encode_csv, 'text/csv'),
+    'ndjson': (encode_ndjson, 'application/x-ndjson'),
+}
+
+
+class _LineBuffer:
+    """
+    File-like object handing back what csv.writer writes instead of storing it.
+    """
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _add_error(report, row_number, errors):
+    report['failed'] += 1
+    report['errors'].append({'row': row_number, 'errors': errors})
@@ -0,0 +1,54 @@
+import hashlib
+import json
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+
+from .serializers import PermissionSerializer
+
+# Bump the suffix when the serialized shape changes, so stale entries are ignored
+CATALOGUE_KEY = 'permissions:catalogue:v1'
+
+
+def get_permission_catalogue():
+    """
+    Return the serialized permission catalogue and its version.
+    Served from the cache; rebuilt from the database when missing.
+    """
+    catalogue = cache.get(CATALOGUE_KEY)
+    if catalogue is None:
+        catalogue = rebuild_permission_catalogue()
+    return catalogue
+
+
+def rebuild_permission_catalogue():
+    """
+    Serialize every permission in one query and store the result in the cache.
+    The catalogue only changes when permissions or content types do (in
+    practice, on migrate), so it is cached without expiry.
+    """
+    permissions = [
+        dict(permission)
+        for permission in PermissionSerializer(Permission.objects.select_related('content_type'), many=True).data
+    ]
+    catalogue = {
+        'version': hashlib.sha1(json.dumps(permissions, sort_keys=True).encode()).hexdigest(),
+        'permissions': permissions,
+    }
+    cache.set(CATALOGUE_KEY, catalogue, None)
+    return catalogue
+
+
+def invalidate_permission_catalogue():
+    cache.delete(CATALOGUE_KEY)
+
+
+def filter_catalogue(permissions, app_label=None, model=None):
+    """
+    Narrow catalogue entries down to a content type's app label and/or model.
+    """
+    if app_label:
+        permissions = [p for p in permissions if p['content_type']['app_label'] == app_label]
+    if model:
+        permissions = [p for p in permissions if p['content_type']['model'] == model]
+    return permissions
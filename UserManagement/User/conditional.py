@@ -0,0 +1,74 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .roles import get_groups_version
+
+# Get the User model
+User = get_user_model()
+
+TOUCH_BATCH_SIZE = 5000
+
+
+def touch_users(user_ids, batch_size=TOUCH_BATCH_SIZE):
+    """
+    Bump updated_at of the given users, in batches.
+    Used when something shown in a user's representation changes without the
+    user being saved, such as their groups, so their ETag changes with it.
+    """
+    user_ids = list(user_ids)
+    now = timezone.now()
+    for offset in range(0, len(user_ids), batch_size):
+        User.objects.filter(pk__in=user_ids[offset:offset + batch_size]).update(updated_at=now)
+
+
+def make_etag(request, *parts):
+    """
+    Weak ETag over the given parts, the request path and the response format.
+    """
+    digest = hashlib.sha1(request.get_full_path().encode())
+    digest.update(request.accepted_renderer.format.encode())
+    for part in parts:
+        digest.update(b'\0' + str(part).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def user_validators(request, users, last_modified=True, links=()):
+    """
+    ETag and Last-Modified of a representation of the given users.
+    Both follow CustomUser.updated_at, which also moves on group changes.
+    Last-Modified is left out for pages, where removing a user would not move it.
+    The links of a page (next, previous) are part of its ETag, as users
+    inserted or deleted beyond the page change them but not its rows.
+    """
+    etag = make_etag(request, *links, *(f'{user.pk}:{user.updated_at.isoformat()}' for user in users))
+    if not last_modified or not users:
+        return etag, None
+    return etag, max(user.updated_at for user in users)
+
+
+def group_validators(request):
+    """
+    ETag of a group representation, following the version stamp bumped
+    whenever a group is saved or deleted.
+    """
+    return make_etag(request, 'groups', get_groups_version()), None
+
+
+def conditional_response(request, etag, last_modified, get_response):
+    """
+    Answer 304 Not Modified when the client's validators match, without
+    calling get_response; otherwise return its response with the validators set.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = get_response()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Accept bursts of concurrent connections from load tests
+    request_queue_size = 256
+
+
+class FakeOAuthServer:
+    """
+    Local stand-in for Google's token and userinfo endpoints.
+    Every authorization code is accepted except "invalid"; the code "alice"
+    yields the user alice@example.com. Used by the tests and load tests so
+    they never reach Google.
+
+        with FakeOAuthServer(latency=0.05) as server:
+            with override_settings(**server.settings):
+                ...
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __enter__(self):
+        self._server = _Server(('127.0.0.1', 0), self._make_handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def settings(self):
+        """
+        Settings pointing the OAuth views at this server.
+        """
+        return {
+            'GOOGLE_OAUTH_TOKEN_URL': f'{self.url}/token',
+            'GOOGLE_OAUTH_USERINFO_URL': f'{self.url}/userinfo',
+        }
+
+    def _count(self, attribute):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so connection reuse by clients is observable
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                server._count('connections')
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode())
+                code = form.get('code', [''])[0]
+                if self.path != '/token' or code in ('', 'invalid'):
+                    return self._respond(400, {'error': 'invalid_grant'})
+                self._respond(200, {'access_token': f'token-{code}', 'token_type': 'Bearer'})
+
+            def do_GET(self):
+                authorization = self.headers.get('Authorization', '')
+                if self.path != '/userinfo' or not authorization.startswith('Bearer token-'):
+                    return self._respond(401, {'error': 'invalid_token'})
+                name = authorization[len('Bearer token-'):]
+                self._respond(200, {
+                    'email': f'{name}@example.com',
+                    'given_name': name.title(),
+                    'family_name': 'Example',
+                })
+
+            def _respond(self, status, payload):
+                server._count('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
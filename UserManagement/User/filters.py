@@ -0,0 +1,87 @@
+import django_filters
+from django.contrib.auth import get_user_model
+from django.db.models import Q, Value
+from rest_framework.filters import OrderingFilter
+
+from .models import AuditEvent
+
+# Get the User model
+User = get_user_model()
+
+# Columns matched by the prefix search
+SEARCH_FIELDS = ('username', 'email', 'phone_number')
+
+
+def prefix_range(field, prefix):
+    """
+    Match values of field starting with prefix, written as a range so a plain
+    B-tree index serves it (LIKE 'prefix%' only uses one under specific
+    collations). The match is case-sensitive.
+    """
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return Q(**{f'{field}__startswith': prefix})
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix[:-1] + chr(last + 1)})
+
+
+class UserFilter(django_filters.FilterSet):
+    """
+    Filters for the user listing and the bulk operations that select users.
+    Every filter is backed by an index on the user or membership table.
+    """
+    is_active = django_filters.BooleanFilter(method='filter_flag')
+    is_verified = django_filters.BooleanFilter(method='filter_flag')
+    group = django_filters.NumberFilter(field_name='groups')
+    joined_after = django_filters.IsoDateTimeFilter(field_name='date_joined', lookup_expr='gte')
+    joined_before = django_filters.IsoDateTimeFilter(field_name='date_joined', lookup_expr='lt')
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = User
+        fields = ('is_active', 'is_verified', 'group', 'joined_after', 'joined_before', 'search')
+
+    def filter_flag(self, queryset, name, value):
+        """
+        Filter on a boolean column with an explicit comparison. Django writes
+        flag=True as a bare "WHERE flag", which SQLite cannot serve from the
+        (flag, -date_joined, id) indexes.
+        """
+        return queryset.filter(**{name: Value(value)})
+
+    def filter_search(self, queryset, name, value):
+        """
+        Prefix search over username, email and phone number.
+        """
+        query = Q()
+        for field in SEARCH_FIELDS:
+            query |= prefix_range(field, value)
+        return queryset.filter(query)
+
+
+class UserOrderingFilter(OrderingFilter):
+    """
+    Ordering filter that always ends on id, so rows tied on the requested
+    field keep a stable order across cursor pages.
+    """
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'id', '-id'} & set(ordering):
+            ordering = (*ordering, 'id')
+        return ordering
+
+
+class AuditEventFilter(django_filters.FilterSet):
+    """
+    Filters for the audit log: by actor, by target and by time range.
+    Each combination is served by one of the AuditEvent indexes.
+    """
+    actor = django_filters.NumberFilter(field_name='actor')
+    action = django_filters.ChoiceFilter(choices=AuditEvent.ACTION_CHOICES)
+    target_type = django_filters.ChoiceFilter(choices=AuditEvent.TARGET_CHOICES)
+    target_id = django_filters.NumberFilter()
+    since = django_filters.IsoDateTimeFilter(field_name='occurred_at', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='occurred_at', lookup_expr='lt')
+
+    class Meta:
+        model = AuditEvent
+        fields = ('actor', 'action', 'target_type', 'target_id', 'since', 'until')
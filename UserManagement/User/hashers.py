@@ -0,0 +1,47 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class TunedArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2id hasher with cost parameters taken from settings.ARGON2_PARAMS.
+    Hashes made with other parameters still verify and are upgraded on login.
+    """
+    time_cost = settings.ARGON2_PARAMS['time_cost']
+    memory_cost = settings.ARGON2_PARAMS['memory_cost']
+    parallelism = settings.ARGON2_PARAMS['parallelism']
+
+
+class TunedScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """
+    Scrypt hasher with cost parameters taken from settings.SCRYPT_PARAMS.
+    Hashes made with other parameters still verify and are upgraded on login.
+    """
+    work_factor = settings.SCRYPT_PARAMS['work_factor']
+    block_size = settings.SCRYPT_PARAMS['block_size']
+    parallelism = settings.SCRYPT_PARAMS['parallelism']
+
+
+# Hashing is CPU bound; run it outside the event loop and outside the single
+# thread Django uses for thread-sensitive sync code, so logins hash in parallel.
+amake_password = sync_to_async(hashers.make_password, thread_sensitive=False)
+_acheck_password = sync_to_async(hashers.check_password, thread_sensitive=False)
+
+
+async def acheck_password(user, raw_password):
+    """
+    Check a user's password from async code without blocking the event loop.
+    Like CustomUser.check_password, the stored hash is upgraded when the
+    preferred hasher or its parameters changed.
+    """
+    upgraded = []
+
+    def setter(raw_password):
+        user.set_password(raw_password)
+        upgraded.append(True)
+
+    valid = await _acheck_password(raw_password, user.password, setter)
+    if upgraded:
+        await user.asave(update_fields=['password'])
+    return valid
@@ -0,0 +1,196 @@
+import bisect
+import contextvars
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Upper bounds (in milliseconds) of the latency histogram buckets; the last one is open-ended
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Query count and timings collected while serving one request.
+    Times every query run while it is the current request's metrics.
+    """
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper timing the query for the current request's metrics, if any.
+    The metrics are found through a context variable rather than a wrapper
+    installed per request, as connections are per thread and the queries of
+    async views run on other threads than the middleware.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """
+    Add record_query to the execute wrappers of a database connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsSerializerMixin:
+    """
+    Serializer mixin adding the time spent in to_representation to the
+    current request's metrics. Nested serializers are counted once, as
+    part of their outermost parent.
+    """
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializer_depth:
+            return super().to_representation(instance)
+
+        metrics.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializer_depth -= 1
+
+
+class MetricsRegistry:
+    """
+    Per-process aggregate of sampled request metrics, keyed by view name.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, metrics, total_time):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, total_time * 1000)
+        with self._lock:
+            stats = self._views.get(view_name)
+            if stats is None:
+                stats = self._views[view_name] = {
+                    'count': 0,
+                    'queries': 0,
+                    'db_time_ms': 0.0,
+                    'serializer_time_ms': 0.0,
+                    'total_time_ms': 0.0,
+                    'latency_histogram': [0] * (len(LATENCY_BUCKETS) + 1),
+                }
+            stats['count'] += 1
+            stats['queries'] += metrics.queries
+            stats['db_time_ms'] += metrics.db_time * 1000
+            stats['serializer_time_ms'] += metrics.serializer_time * 1000
+            stats['total_time_ms'] += total_time * 1000
+            stats['latency_histogram'][bucket] += 1
+
+    def snapshot(self):
+        """
+        Return the aggregated metrics with per-request averages.
+        """
+        with self._lock:
+            views = {name: dict(stats, latency_histogram=list(stats['latency_histogram']))
+                     for name, stats in self._views.items()}
+        for stats in views.values():
+            count = stats['count']
+            stats['avg_queries'] = stats['queries'] / count
+            stats['avg_db_time_ms'] = stats['db_time_ms'] / count
+            stats['avg_serializer_time_ms'] = stats['serializer_time_ms'] / count
+            stats['avg_total_time_ms'] = stats['total_time_ms'] / count
+        return {
+            'latency_buckets_ms': list(LATENCY_BUCKETS) + [None],
+            'views': views,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """
+    Record query count, DB time, serializer time and total latency per request.
+    With REQUEST_METRICS_HEADERS the numbers are returned as response headers;
+    a REQUEST_METRICS_SAMPLE_RATE share of requests is aggregated into the
+    registry. Requests that are neither sampled nor annotated pass straight through.
+    Supports both sync and async handler chains, so async views are not
+    pushed onto a thread under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        sampled = self.is_sampled()
+        if not (settings.REQUEST_METRICS_HEADERS or sampled):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - start, sampled)
+
+    async def __acall__(self, request):
+        sampled = self.is_sampled()
+        if not (settings.REQUEST_METRICS_HEADERS or sampled):
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - start, sampled)
+
+    def is_sampled(self):
+        sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return bool(sample_rate) and random.random() < sample_rate
+
+    def report(self, request, response, metrics, total_time, sampled):
+        if sampled:
+            match = request.resolver_match
+            registry.record(match.view_name if match else 'unresolved', metrics, total_time)
+        if settings.REQUEST_METRICS_HEADERS:
+            response['X-Query-Count'] = str(metrics.queries)
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time * 1000:.2f}, '
+                f'serializer;dur={metrics.serializer_time * 1000:.2f}, '
+                f'total;dur={total_time * 1000:.2f}'
+            )
+        return response
@@ -0,0 +1,121 @@
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from User.benchmarks import benchmark_database, format_stats, summarize
+
+# Get the User model
+User = get_user_model()
+
+# Settings a database falls back to when DATABASES leaves them out
+DJANGO_DEFAULTS = {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark concurrent write throughput (login and logout writes from several threads) '
+        'with Django\'s default connection settings and with the configured database profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+        parser.add_argument('--requests', type=int, default=200, help='Requests per thread.')
+
+    def handle(self, *args, **options):
+        configured = settings.DATABASES['default']
+        profiles = {
+            'django defaults': DJANGO_DEFAULTS,
+            'configured': {key: configured.get(key, value) for key, value in DJANGO_DEFAULTS.items()},
+        }
+        self.stdout.write(f"Engine: {configured['ENGINE']}")
+        for name, overrides in profiles.items():
+            with self.profile(overrides), benchmark_database():
+                for threads in options['threads']:
+                    stats, errors = self.run(threads, options['requests'])
+                    self.stdout.write(f'{format_stats(f"{name}, {threads} threads", stats)}  errors {errors}')
+
+    @contextmanager
+    def profile(self, overrides):
+        """
+        Apply connection settings to the default database for the enclosed
+        block. Connections opened by the worker threads read them too.
+        SQLite runs on a file, as WAL and locking do not apply in memory.
+        """
+        database = settings.DATABASES['default']
+        saved = {key: database.get(key) for key in (*overrides, 'TEST')}
+        database.update(overrides)
+        with tempfile.TemporaryDirectory() as directory:
+            if database['ENGINE'] == 'django.db.backends.sqlite3':
+                database['TEST'] = {**database['TEST'], 'NAME': str(Path(directory) / 'bench.sqlite3')}
+            try:
+                yield
+            finally:
+                # A pool keeps connections to the throwaway database open
+                if hasattr(connection, 'close_pool'):
+                    connection.close_pool()
+                database.update(saved)
+
+    def run(self, threads, requests):
+        users = User.objects.bulk_create([
+            User(username=f'writer-{uuid.uuid4().hex[:12]}', email=f'writer{i}@example.com')
+            for i in range(threads)
+        ])
+        barrier = threading.Barrier(threads + 1)
+        results = []
+
+        def worker(user):
+            timings, errors = [], 0
+            barrier.wait()
+            for _ in range(requests):
+                # Open and close connections the way request handling does
+                request_started.send(sender=self.__class__)
+                start = time.perf_counter()
+                try:
+                    self.login_logout(user)
+                except OperationalError:
+                    errors += 1
+                else:
+                    timings.append((time.perf_counter() - start) * 1000)
+                finally:
+                    request_finished.send(sender=self.__class__)
+            connection.close()
+            results.append((timings, errors))
+
+        workers = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        timings = [timing for thread_timings, _ in results for timing in thread_timings]
+        return summarize(timings, elapsed), sum(errors for _, errors in results)
+
+    def login_logout(self, user):
+        """
+        The writes of a login followed by a logout: the user is read, then
+        last_login is updated and a refresh token recorded, which is then
+        blacklisted.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            User.objects.get(pk=user.pk)
+            User.objects.filter(pk=user.pk).update(last_login=now)
+            token = OutstandingToken.objects.create(
+                user=user, jti=uuid.uuid4().hex, token='', created_at=now, expires_at=now + timedelta(days=1),
+            )
+        BlacklistedToken.objects.get_or_create(token=token)
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from User.benchmarks import benchmark_database, format_stats, measure
+
+# Get the User model
+User = get_user_model()
+
+# Django's stock hashers, for comparison with the tuned ones
+REFERENCE_HASHERS = {
+    'argon2 (django defaults)': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'scrypt (django defaults)': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure password verification and login throughput per core for each hasher.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        configurations = {**settings.PASSWORD_HASHER_CHOICES, **REFERENCE_HASHERS}
+        with benchmark_database():
+            for name, hasher in configurations.items():
+                with override_settings(PASSWORD_HASHERS=[hasher], ALLOWED_HOSTS=['testserver']):
+                    try:
+                        make_password('password')
+                    except ValueError as e:
+                        self.stdout.write(f'{name:<40} skipped: {e}')
+                        continue
+                    self.run(name, options['iterations'])
+
+    def run(self, name, iterations):
+        password = 'correct horse battery staple'
+        encoded = make_password(password)
+        self.stdout.write(format_stats(f'{name}: verify', measure(
+            lambda: check_password(password, encoded), iterations, warmup=2
+        )))
+
+        username = f'bench-{name.split()[0]}-{User.objects.count()}'
+        User.objects.create_user(username, password=password)
+        client = APIClient()
+        credentials = {'username': username, 'password': password}
+
+        def login():
+            response = client.post('/api/auth/login/', credentials, format='json')
+            assert response.status_code == 200, response.data
+
+        self.stdout.write(format_stats(f'{name}: login', measure(login, iterations, warmup=2)))
@@ -0,0 +1,69 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from User.benchmarks import benchmark_database
+
+# Get the User model
+User = get_user_model()
+
+VICTIM = 'victim'
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay brute-force login traffic with and without the login throttles '
+        'and report the CPU time it costs the server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=60, help='Login attempts per scenario.')
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        scenarios = {
+            # One client guessing one account's password
+            'one address, one account': lambda i: ('203.0.113.1', VICTIM),
+            # A botnet guessing one account's password
+            'many addresses, one account': lambda i: (f'198.51.{i // 250}.{i % 250 + 1}', VICTIM),
+            # One client trying a list of leaked credentials
+            'one address, many accounts': lambda i: ('203.0.113.1', f'user-{i}'),
+        }
+        unthrottled = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+
+        # Production-like request handling: no query log, no debug headers
+        with override_settings(DEBUG=False, REQUEST_METRICS_HEADERS=False, ALLOWED_HOSTS=['testserver']):
+            with benchmark_database():
+                User.objects.create_user(VICTIM, 'victim@example.com', 'correct horse battery staple')
+                self.stdout.write(f'{requests} wrong-password logins per scenario, hasher {settings.PASSWORD_HASHERS[0]}')
+                for name, attempt in scenarios.items():
+                    with override_settings(REST_FRAMEWORK=unthrottled):
+                        self.report(f'{name}, unthrottled', self.attack(attempt, requests))
+                    self.report(f'{name}, throttled', self.attack(attempt, requests))
+
+    def attack(self, attempt, requests):
+        cache.clear()
+        client = APIClient()
+        statuses = Counter()
+        cpu, started = time.process_time(), time.perf_counter()
+        for i in range(requests):
+            address, username = attempt(i)
+            response = client.post(
+                '/api/auth/login/', {'username': username, 'password': 'wrong password'},
+                format='json', REMOTE_ADDR=address,
+            )
+            statuses[response.status_code] += 1
+        return statuses, time.process_time() - cpu, time.perf_counter() - started
+
+    def report(self, name, result):
+        statuses, cpu, elapsed = result
+        self.stdout.write(
+            f'{name:<45} CPU {cpu:>7.2f}s  wall {elapsed:>7.2f}s  '
+            f'401 {statuses[401]:>5}  429 {statuses[429]:>5}'
+        )
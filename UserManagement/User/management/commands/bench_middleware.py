@@ -0,0 +1,90 @@
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import RequestFactory, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from User.benchmarks import benchmark_database, format_stats, summarize
+from UserManagement.handlers import APIWSGIHandler
+
+# Get the User model
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark API requests served through the full MIDDLEWARE stack and '
+        'through API_MIDDLEWARE, and the time each handler takes to build.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # Production-like request handling: no query log, no debug headers
+        with override_settings(DEBUG=False, REQUEST_METRICS_HEADERS=False, ALLOWED_HOSTS=['testserver']):
+            handlers = {}
+            for name, handler_class in (('full stack', WSGIHandler), ('API stack', APIWSGIHandler)):
+                start = time.perf_counter()
+                handlers[name] = handler_class()
+                self.stdout.write(f'{name:<12} handler built in {(time.perf_counter() - start) * 1000:.2f} ms')
+
+            with benchmark_database(), self.keep_connection():
+                # Staff, as the group and permission endpoints are admin only
+                user = User.objects.create_user(
+                    'bench-middleware', 'bench@example.com', 'unused password', is_staff=True
+                )
+                headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+                scenarios = {
+                    'users me': '/api/auth/users/me/',
+                    'groups list': '/api/auth/groups/',
+                    'permissions list': '/api/auth/permissions/',
+                }
+                for scenario, path in scenarios.items():
+                    for name, stats in self.compare(handlers, path, headers, iterations).items():
+                        self.stdout.write(format_stats(f'{scenario}, {name}', stats))
+
+    def compare(self, handlers, path, headers, iterations, warmup=10):
+        """
+        Time the request through every handler, alternating between them so
+        that drift in the machine's speed affects them alike.
+        """
+        for handler in handlers.values():
+            for _ in range(warmup):
+                self.call(handler, path, headers)
+        timings = {name: [] for name in handlers}
+        for _ in range(iterations):
+            for name, handler in handlers.items():
+                start = time.perf_counter()
+                self.call(handler, path, headers)
+                timings[name].append((time.perf_counter() - start) * 1000)
+        return {name: summarize(values, sum(values) / 1000) for name, values in timings.items()}
+
+    @contextmanager
+    def keep_connection(self):
+        """
+        Keep the database connection open across requests, as the test
+        client does: the throwaway database may live in memory.
+        """
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+        try:
+            yield
+        finally:
+            for signal in (request_started, request_finished):
+                signal.connect(close_old_connections)
+
+    def call(self, handler, path, headers):
+        environ = RequestFactory().get(path, **headers).environ
+        response = handler(environ, lambda status, response_headers, exc_info=None: None)
+        response.close()
+        # Anything else would time an error response instead of the endpoint
+        if response.status_code != 200:
+            raise CommandError(f'GET {path} returned {response.status_code}')
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from allauth.socialaccount.models import SocialApp
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+
+from User.benchmarks import benchmark_database
+from User.fake_oauth import FakeOAuthServer
+from User.oauth import aclose_async_client
+from User.views import AsyncGoogleCallbackView, GoogleCallbackView
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the sync and async Google callbacks against a local fake OAuth server, '
+        'each served by a single worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--latency', type=float, default=0.05,
+            help='Seconds the fake provider takes to answer each call.'
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(), FakeOAuthServer(latency=options['latency']) as server:
+            with override_settings(ALLOWED_HOSTS=['testserver'], **server.settings):
+                SocialApp.objects.create(provider='google', name='Google', client_id='bench', secret='bench')
+                sync_elapsed = self.run_sync(options['requests'])
+                async_elapsed = asyncio.run(self.run_async(options['requests'], options['concurrency']))
+
+        count = options['requests']
+        self.stdout.write(f'sync worker:  {count / sync_elapsed:8.1f} logins/s ({sync_elapsed:.2f}s)')
+        self.stdout.write(
+            f'async worker: {count / async_elapsed:8.1f} logins/s ({async_elapsed:.2f}s, '
+            f'concurrency {options["concurrency"]})'
+        )
+        self.stdout.write(f'speedup:      {sync_elapsed / async_elapsed:8.1f}x')
+
+    def run_sync(self, count):
+        view = GoogleCallbackView.as_view()
+        factory = RequestFactory()
+        started = time.perf_counter()
+        for i in range(count):
+            response = view(factory.get('/api/auth/google/callback/', {'code': f'sync{i}'}))
+            assert response.status_code == 200, response.data
+        return time.perf_counter() - started
+
+    async def run_async(self, count, concurrency):
+        view = AsyncGoogleCallbackView.as_view()
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login(i):
+            async with semaphore:
+                response = await view(factory.get('/api/auth/google/callback/', {'code': f'async{i}'}))
+                assert response.status_code == 200, response.content
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(count)))
+        elapsed = time.perf_counter() - started
+        await aclose_async_client()
+        return elapsed
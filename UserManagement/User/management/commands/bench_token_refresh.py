@@ -0,0 +1,78 @@
+import io
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from User.benchmarks import benchmark_database, format_stats, measure
+from User.serializers import UserTokenObtainPairSerializer, UserTokenRefreshSerializer
+from User.tokens import REVOKED_TOKEN_KEY
+
+# Get the User model
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark refresh-token blacklist checks against a large blacklist.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Blacklisted tokens to seed.')
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.seed(options['rows'], options['batch_size'])
+            self.run(options['iterations'])
+
+    def seed(self, rows, batch_size):
+        started = time.perf_counter()
+        expires_at = aware_utcnow() + timedelta(days=2)
+        for offset in range(0, rows, batch_size):
+            tokens = OutstandingToken.objects.bulk_create([
+                OutstandingToken(jti=uuid.uuid4().hex, token='', expires_at=expires_at)
+                for _ in range(min(batch_size, rows - offset))
+            ])
+            BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens])
+        self.stdout.write(f'Seeded {rows} blacklisted tokens in {time.perf_counter() - started:.1f}s')
+
+    def run(self, iterations):
+        user = User.objects.create_user('bench', 'bench@example.com')
+        valid = UserTokenObtainPairSerializer.get_token(user)
+        revoked = UserTokenObtainPairSerializer.get_token(user)
+        revoked.blacklist()
+        revoked_key = REVOKED_TOKEN_KEY.format(revoked['jti'])
+
+        def check_revoked(check_blacklist):
+            try:
+                check_blacklist()
+            except TokenError:
+                return
+            raise AssertionError('Revoked token was accepted')
+
+        def check_revoked_in_database():
+            cache.delete(revoked_key)
+            check_revoked(revoked.check_blacklist)
+
+        # Blacklist checks alone, then the full refresh validation for reference
+        results = [
+            ('valid token, blacklist lookup', valid.check_blacklist),
+            ('revoked token, revocation cache', lambda: check_revoked(revoked.check_blacklist)),
+            ('revoked token, blacklist lookup', check_revoked_in_database),
+            ('refresh validation, valid token', lambda: UserTokenRefreshSerializer(
+                data={'refresh': str(valid)}).is_valid(raise_exception=True)),
+        ]
+        for name, func in results:
+            self.stdout.write(format_stats(name, measure(func, iterations)))
+
+        OutstandingToken.objects.update(expires_at=aware_utcnow())
+        started = time.perf_counter()
+        call_command('purge_tokens', stdout=io.StringIO())
+        self.stdout.write(f'purge_tokens removed every row in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,185 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from User.benchmarks import benchmark_database, format_stats, measure
+from User.permission_matrix import refresh_effective_permissions
+from User.roles import invalidate_all_roles
+from User.serializers import UserTokenObtainPairSerializer
+
+# Get the User model
+User = get_user_model()
+
+Membership = User.groups.through
+GroupPermission = Group.permissions.through
+
+ADMIN_USERNAME = 'bench-admin'
+ADMIN_PASSWORD = 'correct horse battery staple'
+
+# Most queries a single request of each scenario may run; --assert-queries
+# also fails when a count grows with the number of users. Writes include the
+# audit flush (BEGIN, INSERT, COMMIT) run once the response has been sent.
+QUERY_BUDGETS = {
+    'login': 2,
+    'token refresh': 2,
+    'logout': 7,
+    'users list': 3,
+    'users me': 2,
+    'assign_groups': 18,
+    'assign_permissions': 12,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the auth and user-management API at several data sizes. '
+        'Runs against a throwaway copy of the configured database (SQLite or PostgreSQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10_000],
+                            help='Numbers of users to benchmark with.')
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--login-iterations', type=int, default=10,
+                            help='Logins are dominated by the password hasher, so fewer are timed.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--assert-queries', action='store_true',
+                            help='Fail when a scenario exceeds its query budget or its query count grows with size.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.options = options
+        failures = []
+        # Production-like request handling: no query log, no debug headers.
+        # Throttles off, as every request comes from the same client.
+        with override_settings(
+            DEBUG=False, REQUEST_METRICS_HEADERS=False, ALLOWED_HOSTS=['testserver'],
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}},
+        ):
+            with benchmark_database():
+                self.setup()
+                baseline = None
+                for size in sorted(options['sizes']):
+                    self.seed_users(size)
+                    self.stdout.write(f'-- {size} users, {len(self.groups)} groups, '
+                                      f'{len(self.permission_ids)} permissions --')
+                    counts = self.run()
+                    if baseline is None:
+                        baseline = counts
+                    failures.extend(self.check_queries(size, counts, baseline))
+
+        if options['assert_queries'] and failures:
+            raise CommandError('Query count regressions:\n' + '\n'.join(failures))
+
+    def setup(self):
+        self.admin = User.objects.create_user(
+            ADMIN_USERNAME, 'bench-admin@example.com', ADMIN_PASSWORD, is_staff=True
+        )
+        self.groups = Group.objects.bulk_create([
+            Group(name=f'bench-group-{i}') for i in range(self.options['groups'])
+        ])
+        self.permission_ids = list(Permission.objects.values_list('id', flat=True))
+        GroupPermission.objects.bulk_create([
+            GroupPermission(group_id=group.id, permission_id=permission_id)
+            for group in self.groups
+            for permission_id in self.random.sample(self.permission_ids, min(5, len(self.permission_ids)))
+        ])
+        self.user_ids = []
+
+    def seed_users(self, size):
+        """
+        Top the database up to size users, each a member of one to three groups.
+        """
+        started = time.perf_counter()
+        # Seeded users never log in; an unusable password skips hashing
+        password = make_password(None)
+        batch_size = self.options['batch_size']
+        for offset in range(len(self.user_ids), size, batch_size):
+            users = User.objects.bulk_create([
+                User(username=f'bench-{i}', email=f'bench-{i}@example.com', password=password)
+                for i in range(offset, min(size, offset + batch_size))
+            ])
+            Membership.objects.bulk_create([
+                Membership(customuser_id=user.id, group_id=group.id)
+                for user in users
+                for group in self.random.sample(self.groups, self.random.randint(1, min(3, len(self.groups))))
+            ])
+            refresh_effective_permissions(User.objects.filter(pk__in=[user.id for user in users]))
+            self.user_ids.extend(user.id for user in users)
+        # Memberships were written directly to the through table
+        invalidate_all_roles()
+        self.stdout.write(f'Seeded {size} users in {time.perf_counter() - started:.1f}s')
+
+    def run(self):
+        """
+        Time every scenario and return the query count of one request of each.
+        """
+        iterations = self.options['iterations']
+        client = APIClient()
+        refresh = UserTokenObtainPairSerializer.get_token(self.admin)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        # Logout blacklists its token, so each call gets a fresh one
+        logout_tokens = iter([
+            str(UserTokenObtainPairSerializer.get_token(self.admin)) for _ in range(iterations + 11)
+        ])
+        credentials = {'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD}
+
+        def assign_groups():
+            user_id = self.random.choice(self.user_ids)
+            group_ids = [group.id for group in self.random.sample(self.groups, 2)]
+            return client.post(f'/api/auth/users/{user_id}/assign_groups/', {'group_ids': group_ids}, format='json')
+
+        def assign_permissions():
+            group = self.random.choice(self.groups)
+            permission_ids = self.random.sample(self.permission_ids, 5)
+            return client.post(f'/api/auth/groups/{group.id}/assign_permissions/',
+                               {'permission_ids': permission_ids}, format='json')
+
+        scenarios = [
+            ('login', self.options['login_iterations'],
+             lambda: client.post('/api/auth/login/', credentials, format='json')),
+            ('token refresh', iterations,
+             lambda: client.post('/api/auth/token/refresh/', {'refresh': str(refresh)}, format='json')),
+            ('logout', iterations,
+             lambda: client.post('/api/auth/logout/', {'refresh': next(logout_tokens)}, format='json')),
+            ('users list', iterations, lambda: client.get('/api/auth/users/')),
+            ('users me', iterations, lambda: client.get('/api/auth/users/me/')),
+            ('assign_groups', iterations, assign_groups),
+            ('assign_permissions', iterations, assign_permissions),
+        ]
+
+        counts = {}
+        for name, count, request in scenarios:
+            def call(request=request, name=name):
+                response = request()
+                if response.status_code != 200:
+                    raise CommandError(f'{name} returned {response.status_code}: {response.data}')
+
+            stats = measure(call, count, warmup=min(10, count))
+            # Counted once caches are warm, as in steady-state traffic
+            with CaptureQueriesContext(connection) as queries:
+                call()
+            counts[name] = len(queries)
+            self.stdout.write(f'{format_stats(name, stats)}  {counts[name]:>3} queries')
+        return counts
+
+    def check_queries(self, size, counts, baseline):
+        failures = []
+        for name, count in counts.items():
+            if count > QUERY_BUDGETS[name]:
+                failures.append(f'{size} users, {name}: {count} queries, budget {QUERY_BUDGETS[name]}')
+            elif count > baseline[name]:
+                failures.append(f'{size} users, {name}: {count} queries, {baseline[name]} at the smallest size')
+        return failures
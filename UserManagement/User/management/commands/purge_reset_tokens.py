@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from User.models import PasswordResetToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired password reset tokens in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = PasswordResetToken.objects.purge_expired(options['batch_size'])
+        self.stdout.write(f'Deleted {deleted} expired reset tokens.')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from User.permission_matrix import REFRESH_BATCH_SIZE, rebuild_effective_permissions
+
+
+class Command(BaseCommand):
+    help = 'Recompute the effective permissions of every user from their groups and direct permissions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REFRESH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = rebuild_effective_permissions(options['batch_size'])
+        self.stdout.write(f'Wrote {written} effective permissions.')
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from User.outbox import DEFAULT_BATCH_SIZE, DEFAULT_MAX_ATTEMPTS, send_pending
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails in batches over a single mail connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for new emails instead of exiting once the outbox is drained.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to wait between polls when running with --loop.'
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_pending(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Sent {total_sent} emails, {total_failed} failed.')
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0004_customuser_reset_token'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='customuser',
+            options={'ordering': ['-date_joined', 'id'], 'verbose_name': 'User', 'verbose_name_plural': 'Users'},
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-date_joined', 'id'], name='user_date_joined_id_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:56
+
+import hashlib
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def move_reset_tokens(apps, schema_editor):
+    """
+    Move outstanding reset tokens off the user table, storing only their hashes.
+    """
+    CustomUser = apps.get_model('User', 'CustomUser')
+    PasswordResetToken = apps.get_model('User', 'PasswordResetToken')
+    expires_at = timezone.now() + timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT)
+    users = CustomUser.objects.exclude(reset_token__isnull=True).exclude(reset_token='')
+    PasswordResetToken.objects.bulk_create([
+        PasswordResetToken(
+            user_id=user_id,
+            token_hash=hashlib.sha256(reset_token.encode()).hexdigest(),
+            expires_at=expires_at,
+        )
+        for user_id, reset_token in users.values_list('id', 'reset_token').iterator()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0006_outboxemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PasswordResetToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_hash', models.CharField(max_length=64, unique=True, verbose_name='Token Hash')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires At')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reset_tokens', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Password Reset Token',
+                'verbose_name_plural': 'Password Reset Tokens',
+            },
+        ),
+        migrations.RunPython(move_reset_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='reset_token',
+        ),
+    ]
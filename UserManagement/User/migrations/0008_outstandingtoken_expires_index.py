@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index the expiry of outstanding JWTs so purge_tokens does not scan the table.
+    The table belongs to simplejwt's token_blacklist app, hence the raw SQL.
+    """
+
+    dependencies = [
+        ('User', '0007_passwordresettoken'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX outstanding_token_expires_idx ON token_blacklist_outstandingtoken (expires_at)',
+            'DROP INDEX outstanding_token_expires_idx',
+        ),
+    ]
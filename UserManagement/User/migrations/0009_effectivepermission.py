@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_effective_permissions(apps, schema_editor):
+    """
+    Materialize the direct and group permissions of every existing user.
+    """
+    CustomUser = apps.get_model('User', 'CustomUser')
+    EffectivePermission = apps.get_model('User', 'EffectivePermission')
+    Permission = apps.get_model('auth', 'Permission')
+    names = {
+        pk: f'{app_label}.{codename}'
+        for pk, app_label, codename in Permission.objects.values_list('pk', 'content_type__app_label', 'codename')
+    }
+    grants = set(CustomUser.user_permissions.through.objects.values_list('customuser_id', 'permission_id'))
+    grants.update(
+        CustomUser.groups.through.objects.filter(group__permissions__isnull=False)
+        .values_list('customuser_id', 'group__permissions')
+    )
+    EffectivePermission.objects.bulk_create(
+        (EffectivePermission(user_id=user_id, permission_id=permission_id, name=names[permission_id])
+         for user_id, permission_id in grants),
+        batch_size=5000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0008_outstandingtoken_expires_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EffectivePermission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Name')),
+                ('permission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auth.permission', verbose_name='Permission')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='effective_permissions', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Effective Permission',
+                'verbose_name_plural': 'Effective Permissions',
+                'indexes': [models.Index(fields=['user', 'name'], name='effective_permission_name_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'permission'), name='effective_permission_unique')],
+            },
+        ),
+        migrations.RunPython(populate_effective_permissions, migrations.RunPython.noop),
+    ]
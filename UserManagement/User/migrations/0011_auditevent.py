@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0010_user_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Occurred At')),
+                ('action', models.CharField(choices=[('user.groups_set', 'User groups set'), ('users.groups_bulk_updated', 'Groups of users updated in bulk'), ('group.permissions_assigned', 'Group permissions assigned'), ('group.permissions_removed', 'Group permissions removed'), ('user.password_changed', 'User password changed'), ('user.password_reset', 'User password reset')], max_length=64, verbose_name='Action')),
+                ('target_type', models.CharField(choices=[('user', 'User'), ('group', 'Group')], max_length=16, verbose_name='Target Type')),
+                ('target_id', models.BigIntegerField(blank=True, null=True, verbose_name='Target ID')),
+                ('changes', models.JSONField(blank=True, default=dict, verbose_name='Changes')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP Address')),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Actor')),
+            ],
+            options={
+                'verbose_name': 'Audit Event',
+                'verbose_name_plural': 'Audit Events',
+                'indexes': [models.Index(fields=['occurred_at'], name='audit_occurred_idx'), models.Index(fields=['actor', 'occurred_at'], name='audit_actor_idx'), models.Index(fields=['target_type', 'target_id', 'occurred_at'], name='audit_target_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0011_auditevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditevent',
+            name='action',
+            field=models.CharField(choices=[('user.groups_set', 'User groups set'), ('users.groups_bulk_updated', 'Groups of users updated in bulk'), ('group.permissions_assigned', 'Group permissions assigned'), ('group.permissions_removed', 'Group permissions removed'), ('group.permissions_updated', 'Group permissions updated'), ('groups.permissions_bulk_updated', 'Permissions of groups updated in bulk'), ('user.password_changed', 'User password changed'), ('user.password_reset', 'User password reset')], max_length=64, verbose_name='Action'),
+        ),
+    ]
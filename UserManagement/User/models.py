@@ -1,24 +1,239 @@
-from django.contrib.auth.models import AbstractUser
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, Permission
 from django.db import models
+from django.utils import timezone
+from django.utils.crypto import get_random_string
 from django.utils.translation import gettext_lazy as _
 
+from .roles import get_user_roles
+
 class CustomUser(AbstractUser):
     phone_number = models.CharField(_('Phone Number'), max_length=15, blank=True, null=True)
     is_verified = models.BooleanField(_('Verified'), default=False)
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
-    reset_token = models.CharField(_('Reset Token'), max_length=32, blank=True, null=True)
 
     class Meta:
         verbose_name = _('User')
         verbose_name_plural = _('Users')
-        ordering = ['-date_joined']
+        ordering = ['-date_joined', 'id']
+        indexes = [
+            # Backs the keyset pagination used by the user listing
+            models.Index(fields=['-date_joined', 'id'], name='user_date_joined_id_idx'),
+            # Lookups by email (password reset, Google login) and the prefix search
+            models.Index(fields=['email'], name='user_email_idx'),
+            models.Index(fields=['phone_number'], name='user_phone_number_idx'),
+            # Flag filters on the listing, walked in listing order
+            models.Index(fields=['is_active', '-date_joined', 'id'], name='user_active_joined_idx'),
+            models.Index(fields=['is_verified', '-date_joined', 'id'], name='user_verified_joined_idx'),
+        ]
 
     def __str__(self):
         return self.username
 
     def has_role(self, role_name):
-        return self.groups.filter(name=role_name).exists()
+        return role_name in get_user_roles(self).groups
 
     def get_role(self):
-        return self.groups.first().name if self.groups.exists() else None
\ No newline at end of file
+        groups = get_user_roles(self).groups
+        return groups[0] if groups else None
+
+
+class EffectivePermission(models.Model):
+    """
+    Permission a user holds, directly or through one of their groups.
+    Kept in sync by the permission_matrix module, so checking whether a user
+    holds a permission is a single indexed lookup instead of a join over
+    groups and permissions.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False,
+        related_name='effective_permissions', verbose_name=_('User')
+    )
+    permission = models.ForeignKey(
+        Permission, on_delete=models.CASCADE, related_name='+', verbose_name=_('Permission')
+    )
+    # Denormalized "app_label.codename", the form used by permission checks
+    name = models.CharField(_('Name'), max_length=255)
+
+    class Meta:
+        verbose_name = _('Effective Permission')
+        verbose_name_plural = _('Effective Permissions')
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'permission'], name='effective_permission_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'name'], name='effective_permission_name_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.name}'
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued for delivery by the outbox worker.
+    Requests only insert a row; the send_outbox command delivers them in batches.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_SENT, _('Sent')),
+        (STATUS_FAILED, _('Failed')),
+    )
+
+    subject = models.CharField(_('Subject'), max_length=255)
+    body = models.TextField(_('Body'))
+    from_email = models.CharField(_('From Email'), max_length=254, blank=True)
+    recipients = models.JSONField(_('Recipients'), default=list)
+    status = models.CharField(_('Status'), max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(_('Attempts'), default=0)
+    next_attempt_at = models.DateTimeField(_('Next Attempt At'), default=timezone.now)
+    last_error = models.TextField(_('Last Error'), blank=True)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    sent_at = models.DateTimeField(_('Sent At'), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _('Outbox Email')
+        verbose_name_plural = _('Outbox Emails')
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+
+class PasswordResetTokenManager(models.Manager):
+    def issue(self, user):
+        """
+        Create a reset token for the user and return its raw value.
+        Only a hash of the token is stored; earlier tokens of the user are discarded.
+        """
+        raw_token = get_random_string(length=32)
+        self.filter(user=user).delete()
+        self.create(
+            user=user,
+            token_hash=hash_reset_token(raw_token),
+            expires_at=timezone.now() + timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT),
+        )
+        return raw_token
+
+    def get_valid(self, raw_token):
+        """
+        Return the unexpired token matching the raw value, or None.
+        """
+        return self.select_related('user').filter(
+            token_hash=hash_reset_token(raw_token), expires_at__gt=timezone.now()
+        ).first()
+
+    def purge_expired(self, batch_size=1000):
+        """
+        Delete expired tokens in batches and return the number deleted.
+        """
+        deleted = 0
+        while True:
+            pks = list(self.filter(expires_at__lte=timezone.now()).values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            deleted += self.filter(pk__in=pks).delete()[0]
+
+
+class PasswordResetToken(models.Model):
+    """
+    Password reset token issued by forgot_password.
+    Looked up by the SHA-256 hash of the token sent to the user.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='reset_tokens', verbose_name=_('User')
+    )
+    token_hash = models.CharField(_('Token Hash'), max_length=64, unique=True)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    expires_at = models.DateTimeField(_('Expires At'), db_index=True)
+
+    objects = PasswordResetTokenManager()
+
+    class Meta:
+        verbose_name = _('Password Reset Token')
+        verbose_name_plural = _('Password Reset Tokens')
+
+    def __str__(self):
+        return f'{self.user} ({self.expires_at})'
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+def hash_reset_token(raw_token):
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+class AuditEvent(models.Model):
+    """
+    Record of a change made to users, groups or permissions through the API.
+    Append-only: events are buffered by the audit module and written in
+    batches once the request is done, and never updated afterwards.
+    """
+    USER_GROUPS_SET = 'user.groups_set'
+    USERS_GROUPS_BULK_UPDATED = 'users.groups_bulk_updated'
+    GROUP_PERMISSIONS_ASSIGNED = 'group.permissions_assigned'
+    GROUP_PERMISSIONS_REMOVED = 'group.permissions_removed'
+    GROUP_PERMISSIONS_UPDATED = 'group.permissions_updated'
+    GROUPS_PERMISSIONS_BULK_UPDATED = 'groups.permissions_bulk_updated'
+    USER_PASSWORD_CHANGED = 'user.password_changed'
+    USER_PASSWORD_RESET = 'user.password_reset'
+    ACTION_CHOICES = (
+        (USER_GROUPS_SET, _('User groups set')),
+        (USERS_GROUPS_BULK_UPDATED, _('Groups of users updated in bulk')),
+        (GROUP_PERMISSIONS_ASSIGNED, _('Group permissions assigned')),
+        (GROUP_PERMISSIONS_REMOVED, _('Group permissions removed')),
+        (GROUP_PERMISSIONS_UPDATED, _('Group permissions updated')),
+        (GROUPS_PERMISSIONS_BULK_UPDATED, _('Permissions of groups updated in bulk')),
+        (USER_PASSWORD_CHANGED, _('User password changed')),
+        (USER_PASSWORD_RESET, _('User password reset')),
+    )
+    TARGET_USER = 'user'
+    TARGET_GROUP = 'group'
+    TARGET_CHOICES = (
+        (TARGET_USER, _('User')),
+        (TARGET_GROUP, _('Group')),
+    )
+
+    occurred_at = models.DateTimeField(_('Occurred At'), default=timezone.now)
+    # No foreign key constraints: events outlive the users and groups they mention
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        blank=True, null=True, related_name='+', verbose_name=_('Actor')
+    )
+    action = models.CharField(_('Action'), max_length=64, choices=ACTION_CHOICES)
+    target_type = models.CharField(_('Target Type'), max_length=16, choices=TARGET_CHOICES)
+    # Empty for bulk changes, whose targets are listed in changes
+    target_id = models.BigIntegerField(_('Target ID'), blank=True, null=True)
+    changes = models.JSONField(_('Changes'), default=dict, blank=True)
+    ip_address = models.GenericIPAddressField(_('IP Address'), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _('Audit Event')
+        verbose_name_plural = _('Audit Events')
+        # One index per query of the audit API; each also serves its time range
+        indexes = [
+            models.Index(fields=['occurred_at'], name='audit_occurred_idx'),
+            models.Index(fields=['actor', 'occurred_at'], name='audit_actor_idx'),
+            models.Index(fields=['target_type', 'target_id', 'occurred_at'], name='audit_target_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.occurred_at}: {self.action}'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Audit events are append-only.')
+        super().save(*args, **kwargs)
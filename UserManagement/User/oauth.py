@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import weakref
+from typing import NamedTuple
+
+import httpx
+import requests
+from allauth.socialaccount.models import SocialApp
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+GOOGLE_APP_KEY = 'oauth:google:app'
+
+_session = None
+_session_lock = threading.Lock()
+
+# One async client per event loop, since connections cannot be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class OAuthApp(NamedTuple):
+    """
+    Credentials of a configured OAuth provider.
+    """
+    client_id: str
+    secret: str
+
+
+def get_google_app():
+    """
+    Return the Google OAuth credentials, cached until the SocialApp changes.
+    Raises SocialApp.DoesNotExist when Google is not configured.
+    """
+    app = cache.get(GOOGLE_APP_KEY)
+    if app is None:
+        social_app = SocialApp.objects.get(provider='google')
+        app = OAuthApp(client_id=social_app.client_id, secret=social_app.secret)
+        cache.set(GOOGLE_APP_KEY, app, None)
+    return app
+
+
+def invalidate_google_app():
+    cache.delete(GOOGLE_APP_KEY)
+
+
+def get_session():
+    """
+    Return the process-wide HTTP session used to talk to the OAuth provider.
+    Connections are kept alive and pooled; connection failures are retried,
+    and idempotent requests are also retried on 5xx responses.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_session():
+    """
+    Close the pooled connections; the next get_session() starts a fresh session.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _build_session():
+    retry = Retry(
+        total=settings.GOOGLE_OAUTH_RETRIES,
+        backoff_factor=0.1,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({'GET'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=settings.GOOGLE_OAUTH_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_async_client():
+    """
+    Return the async HTTP client of the running event loop.
+    Same pooling, timeouts and connection retries as get_session().
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        connect_timeout, read_timeout = settings.GOOGLE_OAUTH_TIMEOUT
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.GOOGLE_OAUTH_POOL_SIZE,
+                max_keepalive_connections=settings.GOOGLE_OAUTH_POOL_SIZE,
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=settings.GOOGLE_OAUTH_RETRIES),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_client():
+    """
+    Close the async HTTP client of the running event loop, if any.
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
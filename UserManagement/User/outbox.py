@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Base delay before retrying a failed email, doubled on every attempt
+RETRY_DELAY = timedelta(seconds=60)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+# How long a worker owns the emails it claimed before another worker may retry them
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def enqueue_email(subject, body, recipients, from_email=None):
+    """
+    Queue an email for delivery by the outbox worker.
+    The email is only sent if the surrounding transaction commits.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.EMAIL_HOST_USER,
+        recipients=list(recipients),
+    )
+
+
+def send_pending(batch_size=DEFAULT_BATCH_SIZE, max_attempts=DEFAULT_MAX_ATTEMPTS, connection=None):
+    """
+    Send one batch of due emails over a single mail connection.
+    Failed emails, including the whole batch when the connection cannot be
+    opened, are retried with exponential backoff until max_attempts is
+    reached, after which they are marked as failed.
+    Returns a (sent, failed) tuple.
+    """
+    emails = _claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent = failed = 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # The mail server is unreachable: the attempt fails for the whole batch
+        for email in emails:
+            email.attempts += 1
+            _schedule_retry(email, e, max_attempts)
+        failed = len(emails)
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.recipients,
+                    connection=connection,
+                )
+                email.attempts += 1
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    failed += 1
+                    _schedule_retry(email, e, max_attempts)
+                else:
+                    sent += 1
+                    email.status = OutboxEmail.STATUS_SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+        finally:
+            connection.close()
+
+    OutboxEmail.objects.bulk_update(
+        emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return sent, failed
+
+
+def _claim_batch(batch_size):
+    """
+    Lock and claim a batch of due emails.
+    Claimed emails are pushed past CLAIM_TIMEOUT so concurrent workers skip
+    them, and picked up again if this worker dies before finishing.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now
+            )[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return emails
+
+
+def _schedule_retry(email, error, max_attempts):
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.STATUS_FAILED
+    else:
+        delay = min(RETRY_DELAY * 2 ** (email.attempts - 1), MAX_RETRY_DELAY)
+        email.next_attempt_at = timezone.now() + delay
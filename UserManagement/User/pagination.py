@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination for user listings.
+    Orders on (-date_joined, id) so every page is a single indexed range scan,
+    no matter how deep the client pages or how large the users table grows.
+    """
+    ordering = ('-date_joined', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class AuditEventCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the audit log, newest events first.
+    """
+    ordering = ('-occurred_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
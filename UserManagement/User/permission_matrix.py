@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+
+from .models import EffectivePermission
+
+# Get the User model
+User = get_user_model()
+
+# Through models backing CustomUser.user_permissions and CustomUser.groups
+DirectPermission = User.user_permissions.through
+Membership = User.groups.through
+
+REFRESH_BATCH_SIZE = 5000
+
+
+def refresh_effective_permissions(users=None):
+    """
+    Recompute the effective permissions of every user in the queryset, or of
+    all users when none is given. Runs one DELETE and one INSERT ... SELECT,
+    whatever the number of users. Returns the number of rows written.
+    """
+    rows = EffectivePermission.objects.all()
+    user_ids = None
+    if users is not None:
+        user_ids = users.order_by().values('pk')
+        rows = rows.filter(user_id__in=user_ids)
+    # No savepoint: a failure here aborts the enclosing change as well
+    with transaction.atomic(savepoint=False):
+        rows.delete()
+        return _insert_effective_permissions(user_ids)
+
+
+def refresh_users(user_ids, batch_size=REFRESH_BATCH_SIZE):
+    """
+    Recompute the effective permissions of the users with the given ids, in batches.
+    """
+    user_ids = list(user_ids)
+    written = 0
+    for offset in range(0, len(user_ids), batch_size):
+        written += refresh_effective_permissions(User.objects.filter(pk__in=user_ids[offset:offset + batch_size]))
+    return written
+
+
+def rebuild_effective_permissions(batch_size=REFRESH_BATCH_SIZE):
+    """
+    Recompute the effective permissions of every user, one batch of users per transaction.
+    Rows of users that no longer exist are removed by the cascade on deletion.
+    """
+    return refresh_users(User.objects.order_by('pk').values_list('pk', flat=True).iterator(), batch_size)
+
+
+def check_permissions(user_ids, names):
+    """
+    Return {user_id: {name: granted}} for the existing users among user_ids.
+    Follows Django's permission checks: inactive users hold no permission
+    and active superusers hold every permission.
+    """
+    users = User.objects.filter(pk__in=user_ids).values_list('pk', 'is_active', 'is_superuser')
+    granted = set(EffectivePermission.objects.filter(
+        user_id__in=user_ids, name__in=names
+    ).values_list('user_id', 'name'))
+    return {
+        pk: {name: is_active and (is_superuser or (pk, name) in granted) for name in names}
+        for pk, is_active, is_superuser in users
+    }
+
+
+def _insert_effective_permissions(user_ids=None):
+    """
+    Insert the union of direct and group permissions of the selected users
+    with a single INSERT ... SELECT.
+    """
+    direct = DirectPermission.objects.all()
+    via_groups = Membership.objects.filter(group__permissions__isnull=False)
+    if user_ids is not None:
+        direct = direct.filter(customuser_id__in=user_ids)
+        via_groups = via_groups.filter(customuser_id__in=user_ids)
+    direct = direct.values(
+        member_id=F('customuser_id'),
+        perm_id=F('permission_id'),
+        perm_name=Concat('permission__content_type__app_label', Value('.'), 'permission__codename'),
+    )
+    via_groups = via_groups.values(
+        member_id=F('customuser_id'),
+        perm_id=F('group__permissions'),
+        perm_name=Concat('group__permissions__content_type__app_label', Value('.'), 'group__permissions__codename'),
+    )
+    # UNION drops permissions granted both directly and through a group
+    select_sql, params = direct.union(via_groups).query.sql_with_params()
+
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(EffectivePermission._meta.get_field(name).column) for name in ('user', 'permission', 'name'))
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {qn(EffectivePermission._meta.db_table)} ({columns}) {select_sql}', params)
+        return cursor.rowcount
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .roles import get_groups_version
+
+# Keyed by what changes with them, so a write moves readers to a new key:
+# a user's updated_at, which also moves when their groups change, and the
+# version stamp bumped whenever a group is saved or deleted
+USER_REPRESENTATION_KEY = 'representations:user:{}:{}'
+GROUP_LIST_KEY = 'representations:groups:{}'
+
+
+def get_user_representation(user, serialize):
+    """
+    Return the serialized user, from the cache when this version of the user
+    has already been serialized.
+    """
+    return _get_or_serialize(USER_REPRESENTATION_KEY.format(user.pk, user.updated_at.isoformat()), serialize)
+
+
+def get_group_list(serialize):
+    """
+    Return the serialized list of groups, from the cache while no group has changed.
+    """
+    return _get_or_serialize(GROUP_LIST_KEY.format(get_groups_version()), serialize)
+
+
+def _get_or_serialize(key, serialize):
+    timeout = getattr(settings, 'REPRESENTATION_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return serialize()
+    data = cache.get(key)
+    if data is None:
+        data = serialize()
+        cache.set(key, data, timeout)
+    return data
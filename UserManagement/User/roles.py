@@ -0,0 +1,118 @@
+import time
+from functools import partial
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+
+# Cache keys for the version counters that namespace cached role sets
+USER_VERSION_KEY = 'roles:user:{}:version'
+GROUPS_VERSION_KEY = 'roles:groups:version'
+ROLES_KEY = 'roles:user:{}:{}:{}'
+
+
+class Roles(NamedTuple):
+    """
+    Resolved group names and permissions for a single user.
+    Groups are ordered by primary key; permissions use the
+    "app_label.codename" form used by Django's permission checks.
+    """
+    groups: tuple
+    permissions: frozenset
+
+
+def get_user_roles(user):
+    """
+    Return the roles of the given user.
+    Roles are loaded at most once per user instance (i.e. once per request)
+    and, when ROLE_CACHE_TIMEOUT is set, shared across requests through the
+    cache, namespaced by the user and group version counters.
+    """
+    roles = getattr(user, '_roles', None)
+    if roles is not None:
+        return roles
+
+    timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 300)
+    if timeout:
+        key = ROLES_KEY.format(user.pk, *_get_versions(user.pk))
+        roles = cache.get(key)
+        if roles is None:
+            roles = load_user_roles(user.pk)
+            cache.set(key, roles, timeout)
+    else:
+        roles = load_user_roles(user.pk)
+
+    user._roles = roles
+    return roles
+
+
+def load_user_roles(user_id):
+    """
+    Load the group names and permissions of a user from the database.
+    """
+    # Imported here since the models module imports this one
+    from .models import EffectivePermission
+
+    groups = Group.objects.filter(user=user_id).order_by('pk').values_list('name', flat=True)
+    permissions = EffectivePermission.objects.filter(user=user_id).values_list('name', flat=True)
+    return Roles(groups=tuple(groups), permissions=frozenset(permissions))
+
+
+def clear_user_roles(user):
+    """
+    Drop the roles memoised on a user instance.
+    """
+    user.__dict__.pop('_roles', None)
+
+
+def invalidate_user_roles(*user_ids):
+    """
+    Invalidate the cached roles of the given users once the current
+    transaction commits.
+    """
+    for user_id in user_ids:
+        _bump_version_on_commit(USER_VERSION_KEY.format(user_id))
+
+
+def invalidate_all_roles():
+    """
+    Invalidate the cached roles of every user once the current transaction
+    commits. Used when a group itself changes (rename, deletion, permissions),
+    since that affects all of its members at once.
+    """
+    _bump_version_on_commit(GROUPS_VERSION_KEY)
+
+
+def get_groups_version():
+    """
+    Return the current version counter shared by all groups.
+    """
+    return _get_version(GROUPS_VERSION_KEY)
+
+
+def _get_versions(user_id):
+    return _get_version(USER_VERSION_KEY.format(user_id)), get_groups_version()
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old value
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def _bump_version_on_commit(key):
+    # Bumped before the commit, a concurrent read could still see the old rows
+    # and cache them under the new version
+    transaction.on_commit(partial(_bump_version, key))
@@ -1,12 +1,29 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.models import Group, Permission
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from .authentication import stamp_issued_at
+from .filters import UserFilter
+from .instrumentation import MetricsSerializerMixin
+from .models import AuditEvent
+from .roles import get_user_roles
+from .tokens import ClaimsRefreshToken, RevocationAwareRefreshToken
 
 # Get the User model
 User = get_user_model()
 
-class GroupSerializer(serializers.ModelSerializer):
+def find_missing_ids(model, ids):
+    """
+    Return the sorted ids among the given ones that match no row of the model.
+    """
+    ids = set(ids)
+    return sorted(ids - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True)))
+
+class GroupSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Group model.
     Handles serialization and deserialization of group data.
@@ -15,7 +32,18 @@ class GroupSerializer(serializers.ModelSerializer):
         model = Group
         fields = ('id', 'name')
 
-class UserSerializer(serializers.ModelSerializer):
+class GroupCountsSerializer(GroupSerializer):
+    """
+    Serializer for Group model with its member and permission counts.
+    Expects the counts to be annotated on the queryset.
+    """
+    member_count = serializers.IntegerField(read_only=True)
+    permission_count = serializers.IntegerField(read_only=True)
+
+    class Meta(GroupSerializer.Meta):
+        fields = GroupSerializer.Meta.fields + ('member_count', 'permission_count')
+
+class UserSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for User model.
     Handles serialization and deserialization of user data including groups.
@@ -39,6 +67,34 @@ class UserSerializer(serializers.ModelSerializer):
                  'groups', 'group_ids')
         read_only_fields = ('is_verified', 'created_at', 'updated_at')
 
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Serializer for obtaining JWT token pairs.
+    Embeds the claims needed to authorize requests without a user lookup.
+    """
+    token_class = RevocationAwareRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        """
+        Create a refresh token carrying the user's identity and roles.
+        The access token inherits these claims.
+        """
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token['roles'] = list(get_user_roles(user).groups)
+        return stamp_issued_at(token)
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Serializer for refreshing JWT access tokens.
+    Rejects revoked refresh tokens from the cache before querying the blacklist,
+    and tokens issued before the user's tokens were revoked.
+    """
+    token_class = ClaimsRefreshToken
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
     Serializer for user registration.
@@ -78,6 +134,153 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
+class UserImportRowSerializer(serializers.Serializer):
+    """
+    Serializer for a single row of a bulk user import.
+    Accepts either a plain password, an already hashed one, or neither.
+    """
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(required=False, allow_blank=True)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    phone_number = serializers.CharField(max_length=15, required=False, allow_blank=True, allow_null=True)
+    password = serializers.CharField(required=False, allow_blank=True, validators=[validate_password])
+    password_hash = serializers.CharField(required=False, allow_blank=True)
+    group_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate_password_hash(self, value):
+        """
+        Validate that the hash was produced by a configured password hasher.
+        """
+        if value:
+            try:
+                identify_hasher(value)
+            except ValueError:
+                raise serializers.ValidationError("Unknown password hash format.")
+        return value
+
+    def validate(self, attrs):
+        """
+        Validate that at most one of password and password_hash is given.
+        """
+        if attrs.get('password') and attrs.get('password_hash'):
+            raise serializers.ValidationError(
+                {"password": "Provide either password or password_hash, not both."}
+            )
+        return attrs
+
+class BulkGroupAssignmentSerializer(serializers.Serializer):
+    """
+    Serializer for assigning groups to many users at once.
+    Users are selected by id, by a filter, or all of them with "all": true;
+    mode decides whether the groups are added, removed, or replace the users'
+    current groups. Removing every group of the selected users (replace with
+    no group_ids) has to be confirmed.
+    """
+    MODES = ('add', 'remove', 'replace')
+
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = serializers.DictField(required=False)
+    all = serializers.BooleanField(default=False)
+    group_ids = serializers.ListField(child=serializers.IntegerField())
+    mode = serializers.ChoiceField(choices=MODES, default='add')
+    confirm = serializers.BooleanField(default=False)
+
+    def validate_filter(self, value):
+        """
+        Validate the filter with the user listing's filters and return the matching users.
+        Unknown filters are rejected instead of ignored, and so is a filter
+        that would select every user.
+        """
+        filterset = UserFilter(data=value, queryset=User.objects.all())
+        unknown = sorted(set(value) - set(filterset.filters))
+        if unknown:
+            raise serializers.ValidationError({key: ["Unsupported filter."] for key in unknown})
+        if all(item in (None, '', [], {}) for item in value.values()):
+            raise serializers.ValidationError(
+                'Filter on at least one field, or send "all": true to select every user.'
+            )
+        if not filterset.is_valid():
+            raise serializers.ValidationError(filterset.errors)
+        return filterset.qs
+
+    def validate(self, attrs):
+        """
+        Validate that users are selected exactly one way, that clearing
+        groups is confirmed, and that every group exists.
+        """
+        if ('user_ids' in attrs) + ('filter' in attrs) + attrs['all'] != 1:
+            raise serializers.ValidationError('Provide one of user_ids, filter or "all": true.')
+        if not attrs['group_ids']:
+            if attrs['mode'] != 'replace':
+                raise serializers.ValidationError({"group_ids": "This list may not be empty."})
+            if not attrs['confirm']:
+                raise serializers.ValidationError(
+                    {"group_ids": 'Replacing with no groups removes every group of the selected users; '
+                                  'send "confirm": true to do so.'}
+                )
+        missing = find_missing_ids(Group, attrs['group_ids'])
+        if missing:
+            raise serializers.ValidationError({"group_ids": f"Unknown group ids: {missing}"})
+        return attrs
+
+class GroupPermissionIdsSerializer(serializers.Serializer):
+    """
+    Serializer for the permissions assigned to or removed from a group.
+    """
+    permission_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+class GroupPermissionDiffSerializer(serializers.Serializer):
+    """
+    Serializer for granting and revoking permissions of a group in one request.
+    """
+    add = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        """
+        Validate that something changes, that no permission is both added and
+        removed, and that every permission exists.
+        """
+        add, remove = set(attrs['add']), set(attrs['remove'])
+        if not add and not remove:
+            raise serializers.ValidationError("Provide permissions to add or remove.")
+        both = add & remove
+        if both:
+            raise serializers.ValidationError(f"Permissions both added and removed: {sorted(both)}")
+        errors = {
+            field: f"Unknown permission ids: {missing}"
+            for field, ids in (('add', add), ('remove', remove))
+            if (missing := find_missing_ids(Permission, ids))
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        attrs['add'], attrs['remove'] = sorted(add), sorted(remove)
+        return attrs
+
+class BulkGroupPermissionDiffSerializer(GroupPermissionDiffSerializer):
+    """
+    Serializer for applying the same permission changes to many groups at once.
+    """
+    group_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_group_ids(self, value):
+        """
+        Validate that every group exists and drop duplicate ids.
+        """
+        missing = find_missing_ids(Group, value)
+        if missing:
+            raise serializers.ValidationError(f"Unknown group ids: {missing}")
+        return sorted(set(value))
+
+class PermissionCheckSerializer(serializers.Serializer):
+    """
+    Serializer for checking many permissions of many users at once.
+    Permissions use the "app_label.codename" form.
+    """
+    user_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+    permissions = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=100)
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     Serializer for changing user password.
@@ -119,7 +322,7 @@ class ResetPasswordSerializer(serializers.Serializer):
             raise serializers.ValidationError({"new_password": "Password fields didn't match."})
         return attrs
 
-class PermissionSerializer(serializers.ModelSerializer):
+class PermissionSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Permission model.
     Handles serialization of permission data including content type information.
@@ -140,4 +343,14 @@ class PermissionSerializer(serializers.ModelSerializer):
             'id': obj.content_type.id,
             'app_label': obj.content_type.app_label,
             'model': obj.content_type.model
-        } 
\ No newline at end of file
+        } 
+
+class AuditEventSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for AuditEvent model.
+    Read-only representation of a recorded change.
+    """
+    class Meta:
+        model = AuditEvent
+        fields = ('id', 'occurred_at', 'actor', 'action', 'target_type', 'target_id', 'changes', 'ip_address')
+        read_only_fields = fields
@@ -0,0 +1,201 @@
+from allauth.socialaccount.models import SocialApp
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .audit import flush_events
+from .authentication import revoke_user_tokens
+from .catalogue import invalidate_permission_catalogue, rebuild_permission_catalogue
+from .conditional import touch_users
+from .instrumentation import install_query_recorder
+from .models import EffectivePermission
+from .oauth import invalidate_google_app
+from .permission_matrix import refresh_effective_permissions, refresh_users
+from .roles import clear_user_roles, invalidate_all_roles, invalidate_user_roles
+
+# Get the User model
+User = get_user_model()
+
+M2M_CHANGE_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+# User flags access tokens carry as claims
+PRIVILEGE_FIELDS = ('is_staff', 'is_superuser')
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_grants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recompute the effective permissions of users whose groups or permissions
+    change, then invalidate their cached roles, which are read from them.
+    Group changes also move their updated_at, as groups are part of their
+    representation, and revoke their tokens, which carry them as role claims.
+    """
+    if action == 'pre_clear' and reverse:
+        # clear() from the group/permission side does not pass the user ids
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action in M2M_CHANGE_ACTIONS:
+        if not reverse:
+            user_ids = [instance.pk]
+            clear_user_roles(instance)
+        elif pk_set:
+            user_ids = list(pk_set)
+        else:
+            user_ids = instance.__dict__.pop('_cleared_user_ids', [])
+        refresh_users(user_ids)
+        invalidate_user_roles(*user_ids)
+        if sender is User.groups.through:
+            touch_users(user_ids)
+            revoke_user_tokens(*user_ids)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_grants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recompute the effective permissions of the members of groups whose
+    permissions change, then invalidate the cached roles read from them.
+    """
+    if action == 'pre_clear' and reverse:
+        # clear() from the permission side does not pass the group ids
+        instance._cleared_group_ids = list(instance.group_set.values_list('pk', flat=True))
+    elif action in M2M_CHANGE_ACTIONS:
+        if not reverse:
+            group_ids = [instance.pk]
+        elif pk_set:
+            group_ids = pk_set
+        else:
+            group_ids = instance.__dict__.pop('_cleared_group_ids', ())
+        if group_ids:
+            refresh_effective_permissions(User.objects.filter(groups__in=group_ids))
+        invalidate_all_roles()
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    """
+    Remember the members of a group being deleted; its memberships go with it.
+    """
+    instance._member_ids = list(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    """
+    Recompute the effective permissions of the former members of a deleted
+    group, and revoke their tokens, whose role claims still name it.
+    """
+    member_ids = instance.__dict__.pop('_member_ids', [])
+    refresh_users(member_ids)
+    touch_users(member_ids)
+    revoke_user_tokens(*member_ids)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    """
+    Move updated_at of the members of a renamed group, whose representation
+    shows its name, and revoke their tokens, whose role claims do too.
+    """
+    if not created:
+        member_ids = list(User.objects.filter(groups=instance).values_list('pk', flat=True))
+        touch_users(member_ids)
+        revoke_user_tokens(*member_ids)
+
+
+@receiver(post_save, sender=Permission)
+def permission_saved(sender, instance, created, **kwargs):
+    """
+    Keep the denormalized names of effective permissions in step with a renamed permission.
+    """
+    if not created:
+        EffectivePermission.objects.filter(permission=instance).update(
+            name=f'{instance.content_type.app_label}.{instance.codename}'
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def group_changed(sender, **kwargs):
+    """
+    Invalidate cached roles when a group or permission is renamed or deleted.
+    """
+    invalidate_all_roles()
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_save, sender=ContentType)
+@receiver(post_delete, sender=ContentType)
+def permission_catalogue_changed(sender, **kwargs):
+    """
+    Drop the cached permission catalogue when a permission or content type changes.
+    """
+    invalidate_permission_catalogue()
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    """
+    Rebuild the permission catalogue once migrate has created the permissions of an app.
+    """
+    if using == DEFAULT_DB_ALIAS:
+        rebuild_permission_catalogue()
+
+
+@receiver(post_init, sender=User)
+def user_initialized(sender, instance, **kwargs):
+    """
+    Remember the staff and superuser flags a user is loaded with, so saving
+    it can tell whether they changed without a query.
+    """
+    # Deferred flags are left alone rather than loaded with a query each
+    if all(field in instance.__dict__ for field in PRIVILEGE_FIELDS):
+        instance._loaded_privileges = tuple(instance.__dict__[field] for field in PRIVILEGE_FIELDS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_access_changed(sender, instance, signal, created=False, update_fields=None, **kwargs):
+    """
+    Revoke the outstanding tokens of users who are deactivated, deleted, or
+    whose staff or superuser flag changes, as tokens carry those as claims.
+    """
+    if signal is post_delete or not instance.is_active:
+        revoke_user_tokens(instance.pk)
+    elif update_fields is None or not set(PRIVILEGE_FIELDS).isdisjoint(update_fields):
+        loaded = instance.__dict__.get('_loaded_privileges')
+        privileges = tuple(getattr(instance, field) for field in PRIVILEGE_FIELDS)
+        instance._loaded_privileges = privileges
+        if not created and loaded is not None and loaded != privileges:
+            revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=SocialApp)
+@receiver(post_delete, sender=SocialApp)
+def social_app_changed(sender, **kwargs):
+    """
+    Drop the cached OAuth credentials when a provider is reconfigured.
+    """
+    invalidate_google_app()
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """
+    Time the queries of every new database connection for the request metrics.
+    """
+    install_query_recorder(connection)
+
+
+@receiver(request_finished)
+def request_done(sender, **kwargs):
+    """
+    Write the audit events buffered while the response was produced.
+    """
+    flush_events()
@@ -1,3 +1,1341 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from allauth.socialaccount.models import SocialApp
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from UserManagement.handlers import ASGIDispatcher, WSGIDispatcher
+
+from .audit import flush_events, record_event
+from .authentication import StatelessJWTAuthentication
+from .catalogue import invalidate_permission_catalogue
+from .fake_oauth import FakeOAuthServer
+from .filters import UserFilter
+from .instrumentation import RequestMetricsMiddleware, registry
+from .models import AuditEvent, EffectivePermission, OutboxEmail, PasswordResetToken
+from .oauth import aclose_async_client, close_session, get_google_app
+from .outbox import enqueue_email, send_pending
+from .roles import get_user_roles
+from .serializers import UserTokenObtainPairSerializer
+from .throttling import LoginUsernameRateThrottle
+from .views import AsyncGoogleCallbackView, AsyncUserLoginView
+
+User = get_user_model()
+
+
+class UserListTests(TestCase):
+    """
+    Tests for the paginated user listing.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        groups = [Group.objects.create(name=f'group-{i}') for i in range(3)]
+        for i in range(30):
+            user = User.objects.create_user(f'user-{i}', f'user-{i}@example.com')
+            user.groups.set(groups[:i % 3 + 1])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_list_is_cursor_paginated(self):
+        response = self.client.get('/api/auth/users/', {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+
+        seen = [row['id'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(row['id'] for row in response.data['results'])
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), User.objects.count())
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        counts = []
+        for page_size in (2, 25):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/auth/users/', {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class UserFilterTests(TestCase):
+    """
+    Tests for filtering, prefix search and ordering of the user listing.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.group = Group.objects.create(name='Editors')
+        now = timezone.now()
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', is_verified=True, phone_number='5550100')
+        cls.bob = User.objects.create_user('bob', 'bob@example.org', date_joined=now - timedelta(days=30))
+        cls.carol = User.objects.create_user('carol', 'carol@example.com', is_active=False, phone_number='4440100')
+        cls.bob.groups.add(cls.group)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def usernames(self, **params):
+        response = self.client.get('/api/auth/users/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['username'] for row in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.usernames(is_verified='true'), ['alice'])
+        self.assertEqual(self.usernames(is_active='false'), ['carol'])
+        self.assertEqual(self.usernames(group=self.group.pk), ['bob'])
+        week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+        self.assertEqual(self.usernames(joined_before=week_ago), ['bob'])
+        self.assertNotIn('bob', self.usernames(joined_after=week_ago))
+
+    def test_prefix_search(self):
+        self.assertEqual(self.usernames(search='ali'), ['alice'])
+        self.assertEqual(self.usernames(search='bob@example.o'), ['bob'])
+        self.assertEqual(self.usernames(search='444'), ['carol'])
+        self.assertEqual(self.usernames(search='lice'), [])
+
+    def test_ordering(self):
+        self.assertEqual(self.usernames(ordering='username'), ['admin', 'alice', 'bob', 'carol'])
+        self.assertEqual(self.usernames(ordering='-email')[0], 'carol')
+
+    @skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+    def test_filters_use_indexes(self):
+        queryset = User.objects.order_by('-date_joined', 'id')
+        plans = {
+            'user_verified_joined_idx': UserFilter({'is_verified': True}, queryset).qs,
+            'user_active_joined_idx': UserFilter({'is_active': False}, queryset).qs,
+            'user_email_idx': UserFilter({'search': 'al'}, queryset).qs,
+            'user_phone_number_idx': UserFilter({'search': '555'}, queryset).qs,
+            'User_customuser_groups_group_id': UserFilter({'group': self.group.pk}, queryset).qs,
+            'user_date_joined_id_idx': UserFilter({'joined_after': '2024-01-01T00:00:00Z'}, queryset).qs,
+        }
+        for index, filtered in plans.items():
+            with self.subTest(index=index):
+                plan = filtered.explain()
+                self.assertIn(index, plan)
+                self.assertNotRegex(plan, r'SCAN User_customuser\b')
+        self.assertIn('USING INDEX user_email_idx (email=?)', User.objects.filter(email='a@example.com').explain())
+
+
+class ConditionalRequestTests(TestCase):
+    """
+    Tests for ETag and Last-Modified support on user and group resources.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.group = Group.objects.create(name='Editors')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.admin.pk))
+
+    def revalidate(self, path, response):
+        return self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_me(self):
+        response = self.client.get('/api/auth/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            cached = self.revalidate('/api/auth/users/me/', response)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        modified = self.client.get('/api/auth/users/me/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(modified.status_code, 304)
+
+    def test_group_changes_invalidate_user_etags(self):
+        path = f'/api/auth/users/{self.admin.pk}/'
+        response = self.client.get(path)
+        self.assertEqual(self.revalidate(path, response).status_code, 304)
+
+        self.admin.groups.add(self.group)
+        response = self.revalidate(path, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['groups'], [{'id': self.group.pk, 'name': 'Editors'}])
+
+        self.group.name = 'Writers'
+        self.group.save()
+        response = self.revalidate(path, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['groups'][0]['name'], 'Writers')
+
+    def test_list_pages(self):
+        response = self.client.get('/api/auth/users/')
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate('/api/auth/users/', response).status_code, 304)
+        User.objects.create_user('member', 'member@example.com')
+        self.assertEqual(self.revalidate('/api/auth/users/', response).status_code, 200)
+
+    def test_list_page_links(self):
+        path = '/api/auth/users/?page_size=1'
+        response = self.client.get(path)
+        self.assertIsNone(response.data['next'])
+        # Joined earlier: the page keeps its row but gains a next link
+        User.objects.create_user('member', 'member@example.com', date_joined=timezone.now() - timedelta(days=1))
+        response = self.revalidate(path, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_groups(self):
+        response = self.client.get('/api/auth/groups/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revalidate('/api/auth/groups/', response).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.create(name='Viewers')
+        response = self.revalidate('/api/auth/groups/', response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+
+class RepresentationCacheTests(TestCase):
+    """
+    Tests for the cached user and group representations.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.group = Group.objects.create(name='Editors')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.admin.pk))
+
+    def test_me(self):
+        self.client.get('/api/auth/users/me/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/auth/users/me/').data['groups'], [])
+
+        self.admin.groups.add(self.group)
+        self.client.force_authenticate(User.objects.get(pk=self.admin.pk))
+        response = self.client.get('/api/auth/users/me/')
+        self.assertEqual(response.data['groups'], [{'id': self.group.pk, 'name': 'Editors'}])
+
+    def test_group_list(self):
+        self.client.get('/api/auth/groups/')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get('/api/auth/groups/').data), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.create(name='Viewers')
+        self.assertEqual(len(self.client.get('/api/auth/groups/').data), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.delete()
+        self.assertEqual([group['name'] for group in self.client.get('/api/auth/groups/').data], ['Viewers'])
+
+
+class PermissionCatalogueTests(TestCase):
+    """
+    Tests for the cached permission catalogue.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+
+    def setUp(self):
+        invalidate_permission_catalogue()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_list_is_built_once(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/auth/permissions/')
+        self.assertEqual(len(response.data), Permission.objects.count())
+        self.assertEqual(set(response.data[0]['content_type']), {'id', 'app_label', 'model'})
+        with self.assertNumQueries(0):
+            self.client.get('/api/auth/permissions/')
+            cached = self.client.get('/api/auth/permissions/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_filters(self):
+        response = self.client.get('/api/auth/permissions/', {'app_label': 'auth', 'model': 'group'})
+        self.assertEqual(
+            sorted(row['codename'] for row in response.data),
+            ['add_group', 'change_group', 'delete_group', 'view_group']
+        )
+
+    def test_permission_changes_invalidate(self):
+        response = self.client.get('/api/auth/permissions/', {'app_label': 'auth', 'model': 'group'})
+        Permission.objects.create(
+            codename='audit_group', name='Can audit group',
+            content_type=ContentType.objects.get_for_model(Group)
+        )
+        response = self.client.get(
+            '/api/auth/permissions/', {'app_label': 'auth', 'model': 'group'}, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('audit_group', [row['codename'] for row in response.data])
+
+
+class RequestMetricsTests(TestCase):
+    """
+    Tests for the request instrumentation middleware and metrics endpoint.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    @override_settings(REQUEST_METRICS_HEADERS=True, REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_debug_headers(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/users/')
+        self.assertEqual(response['X-Query-Count'], str(len(queries)))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+, serializer;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertEqual(registry.snapshot()['views'], {})
+
+    @override_settings(REQUEST_METRICS_HEADERS=False, REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_aggregated(self):
+        self.client.get('/api/auth/users/')
+        self.client.get('/api/auth/users/')
+        response = self.client.get('/api/auth/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Query-Count', response)
+        stats = response.data['views']['user-list']
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(sum(stats['latency_histogram']), 2)
+        self.assertGreater(stats['avg_queries'], 0)
+
+    @override_settings(REQUEST_METRICS_HEADERS=True, REQUEST_METRICS_SAMPLE_RATE=0)
+    async def test_async_chain_stays_async(self):
+        async def view(request):
+            await User.objects.acount()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(AsyncRequestFactory().get('/'))
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    def test_metrics_are_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('member', 'member@example.com'))
+        self.assertEqual(self.client.get('/api/auth/metrics/').status_code, 403)
+
+
+class RecordingMiddleware:
+    """
+    Middleware recording the stack that served each request, for the
+    dispatcher tests.
+    """
+    stack = None
+    served = []
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        self.served.append(self.stack)
+        return self.get_response(request)
+
+
+class SiteRecordingMiddleware(RecordingMiddleware):
+    stack = 'site'
+
+
+class APIRecordingMiddleware(RecordingMiddleware):
+    stack = 'api'
+
+
+class APIMiddlewareTests(SimpleTestCase):
+    """
+    Tests for the deployment handlers routing API requests through API_MIDDLEWARE.
+    """
+    def call(self, application, path):
+        started = {}
+        response = application(
+            RequestFactory().get(path).environ,
+            lambda status, headers, exc_info=None: started.update(status=status, headers=dict(headers)),
+        )
+        response.close()
+        return int(started['status'].split()[0]), started['headers']
+
+    def test_api_requests_skip_the_browser_middleware(self):
+        status, headers = self.call(WSGIDispatcher(), '/api/auth/login/')
+        self.assertEqual(status, 405)
+        self.assertNotIn('X-Frame-Options', headers)
+        self.assertNotIn('Cookie', headers.get('Vary', ''))
+
+    def test_other_requests_use_the_full_stack(self):
+        status, headers = self.call(WSGIDispatcher(), '/missing/')
+        self.assertEqual(status, 404)
+        self.assertEqual(headers['X-Frame-Options'], 'DENY')
+
+    async def test_asgi_dispatch(self):
+        application = ASGIDispatcher()
+        for path, status, framed in (('/api/auth/login/', 405, False), ('/missing/', 404, True)):
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                'headers': [(b'host', b'testserver')],
+            })
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output()
+            await communicator.wait()
+            self.assertEqual(start['status'], status)
+            headers = {name.lower() for name, value in start['headers']}
+            self.assertEqual(b'x-frame-options' in headers, framed)
+
+    @override_settings(
+        MIDDLEWARE=['User.tests.SiteRecordingMiddleware'],
+        API_MIDDLEWARE=['User.tests.APIRecordingMiddleware'],
+    )
+    async def test_dispatchers_pick_the_middleware_stack(self):
+        RecordingMiddleware.served.clear()
+        wsgi_application = await sync_to_async(WSGIDispatcher)()
+        asgi_application = ASGIDispatcher()
+        self.assertEqual(settings.MIDDLEWARE, ['User.tests.SiteRecordingMiddleware'])
+
+        await sync_to_async(self.call)(wsgi_application, '/api/auth/login/')
+        await sync_to_async(self.call)(wsgi_application, '/missing/')
+        for path in ('/api/auth/login/', '/missing/'):
+            communicator = ApplicationCommunicator(asgi_application, {
+                'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                'headers': [(b'host', b'testserver')],
+            })
+            await communicator.send_input({'type': 'http.request'})
+            await communicator.receive_output()
+            await communicator.wait()
+        self.assertEqual(RecordingMiddleware.served, ['api', 'site', 'api', 'site'])
+
+
+class RoleCacheTests(TestCase):
+    """
+    Tests for the per-request and shared role caches.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.user = User.objects.create_user('member', 'member@example.com')
+        cls.manager = Group.objects.create(name='Manager')
+        cls.staff = Group.objects.create(name='Staff')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_roles_are_loaded_once_per_instance(self):
+        self.user.groups.add(self.staff)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(2):
+            self.assertTrue(user.has_role('Staff'))
+            self.assertFalse(user.has_role('Manager'))
+            self.assertEqual(user.get_role(), 'Staff')
+
+    def test_roles_are_shared_through_the_cache(self):
+        User.objects.get(pk=self.user.pk).get_role()
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertIsNone(user.get_role())
+
+    def test_assign_groups_invalidates_roles(self):
+        self.assertFalse(User.objects.get(pk=self.user.pk).has_role('Manager'))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                f'/api/auth/users/{self.user.pk}/assign_groups/',
+                {'group_ids': [self.manager.pk]}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(pk=self.user.pk).has_role('Manager'))
+
+    def test_group_permission_change_invalidates_roles(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.staff)
+        self.assertEqual(User.objects.get(pk=self.user.pk).get_role(), 'Staff')
+        permission = Permission.objects.get(codename='view_group')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.permissions.add(permission)
+        roles = get_user_roles(User.objects.get(pk=self.user.pk))
+        self.assertIn('auth.view_group', roles.permissions)
+
+    def test_invalidation_waits_for_commit(self):
+        self.assertIsNone(User.objects.get(pk=self.user.pk).get_role())
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.groups.add(self.staff)
+            # Not committed yet: the cached roles stay current for other readers
+            self.assertIsNone(User.objects.get(pk=self.user.pk).get_role())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(User.objects.get(pk=self.user.pk).get_role(), 'Staff')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StatelessAuthenticationTests(TestCase):
+    """
+    Tests for the claim-based JWT authentication.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', 'member@example.com', 'secret-pass')
+        cls.user.groups.add(Group.objects.create(name='Manager'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'member', 'password': 'secret-pass'}, format='json'
+        )
+        self.access = response.data['access']
+        self.refresh = response.data['refresh']
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        return StatelessJWTAuthentication().authenticate(request)
+
+    def test_login_embeds_role_claims(self):
+        token = AccessToken(self.access)
+        self.assertEqual(token['username'], 'member')
+        self.assertFalse(token['is_staff'])
+        self.assertEqual(token['roles'], ['Manager'])
+
+    def test_authenticates_without_queries(self):
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.has_role('Manager'))
+
+    def test_deactivated_user_is_rejected(self):
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_privilege_change_revokes_tokens(self):
+        self.user.first_name = 'Unchanged privileges'
+        # The flags are compared with the loaded ones, without a query
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            self.user.save()
+        self.authenticate()
+        self.user.is_staff = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_group_change_revokes_access_and_refresh_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        # Access tokens from the refresh token would carry the old roles
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    @mock.patch('User.authentication.time')
+    def test_token_issued_in_the_revocation_second_is_accepted(self, mock_time):
+        mock_time.time.return_value = 2000000000.25
+        self.user.is_staff = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        mock_time.time.return_value = 2000000000.75
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'member', 'password': 'secret-pass'}, format='json'
+        )
+        self.access = response.data['access']
+        user, _ = self.authenticate()
+        self.assertTrue(user.is_staff)
+        response = self.client.post(
+            '/api/auth/token/refresh/', {'refresh': response.data['refresh']}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkGroupAssignmentTests(TestCase):
+    """
+    Tests for assigning groups to many users in one call.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.editors = Group.objects.create(name='Editors')
+        cls.viewers = Group.objects.create(name='Viewers')
+        cls.users = [User.objects.create_user(f'user-{i}', f'user-{i}@example.com') for i in range(6)]
+        for user in cls.users[:3]:
+            user.groups.add(cls.viewers)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assign(self, **data):
+        return self.client.post('/api/auth/users/bulk_assign_groups/', data, format='json')
+
+    def members(self, group):
+        return set(group.user_set.values_list('username', flat=True))
+
+    def test_add_by_ids_skips_existing_memberships(self):
+        response = self.assign(user_ids=[user.id for user in self.users], group_ids=[self.viewers.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['users'], response.data['added'], response.data['removed']), (6, 3, 0))
+        self.assertEqual(len(self.members(self.viewers)), 6)
+
+    def test_remove_by_filter(self):
+        response = self.assign(filter={'search': 'user-'}, group_ids=[self.viewers.id], mode='remove')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['removed'], 3)
+        self.assertEqual(self.members(self.viewers), set())
+
+    def test_replace_users_selected_by_their_group(self):
+        response = self.assign(filter={'group': self.viewers.id}, group_ids=[self.editors.id], mode='replace')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['users'], response.data['added'], response.data['removed']), (3, 3, 3))
+        self.assertEqual(self.members(self.editors), {'user-0', 'user-1', 'user-2'})
+        self.assertEqual(self.members(self.viewers), set())
+
+    def test_cached_roles_are_invalidated(self):
+        user = self.users[4]
+        self.assertEqual(get_user_roles(User.objects.get(pk=user.pk)).groups, ())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assign(user_ids=[user.id], group_ids=[self.editors.id])
+        self.assertEqual(get_user_roles(User.objects.get(pk=user.pk)).groups, ('Editors',))
+
+    def test_selecting_every_user_is_explicit(self):
+        for selection in ({'filter': {}}, {'filter': {'search': ''}}, {'filter': {}, 'all': True}):
+            self.assertEqual(self.assign(**selection, group_ids=[self.editors.id]).status_code, 400)
+        response = self.assign(all=True, group_ids=[self.editors.id])
+        self.assertEqual((response.status_code, response.data['users']), (200, 7))
+
+    def test_clearing_groups_is_confirmed(self):
+        self.assertEqual(self.assign(user_ids=[self.users[0].id], group_ids=[], mode='replace').status_code, 400)
+        self.assertEqual(self.members(self.viewers), {'user-0', 'user-1', 'user-2'})
+        response = self.assign(user_ids=[self.users[0].id], group_ids=[], mode='replace', confirm=True)
+        self.assertEqual((response.status_code, response.data['removed']), (200, 1))
+        self.assertEqual(self.members(self.viewers), {'user-1', 'user-2'})
+
+    def test_rejects_invalid_requests(self):
+        self.assertEqual(self.assign(user_ids=[self.users[0].id], group_ids=[999]).status_code, 400)
+        self.assertEqual(self.assign(group_ids=[self.editors.id]).status_code, 400)
+        self.assertEqual(self.assign(filter={'password': 'x'}, group_ids=[self.editors.id]).status_code, 400)
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.assign(user_ids=[self.users[0].id], group_ids=[self.editors.id]).status_code, 403)
+
+
+class EffectivePermissionTests(TestCase):
+    """
+    Tests for the materialized user permissions and the endpoints reading them.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.user = User.objects.create_user('member', 'member@example.com')
+        cls.editors = Group.objects.create(name='Editors')
+        cls.add_group = Permission.objects.get(codename='add_group')
+        cls.view_group = Permission.objects.get(codename='view_group')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def names(self, user):
+        return set(EffectivePermission.objects.filter(user=user).values_list('name', flat=True))
+
+    def test_follows_group_and_direct_grants(self):
+        self.user.groups.add(self.editors)
+        self.editors.permissions.add(self.add_group)
+        self.user.user_permissions.add(self.add_group, self.view_group)
+        self.assertEqual(self.names(self.user), {'auth.add_group', 'auth.view_group'})
+
+        self.user.user_permissions.clear()
+        self.assertEqual(self.names(self.user), {'auth.add_group'})
+        self.add_group.group_set.clear()
+        self.assertEqual(self.names(self.user), set())
+
+        self.editors.permissions.add(self.view_group)
+        self.editors.user_set.clear()
+        self.assertEqual(self.names(self.user), set())
+
+    def test_group_deletion_and_bulk_assignment(self):
+        self.editors.permissions.add(self.view_group)
+        self.client.post('/api/auth/users/bulk_assign_groups/', {
+            'user_ids': [self.user.pk], 'group_ids': [self.editors.pk]
+        }, format='json')
+        self.assertEqual(self.names(self.user), {'auth.view_group'})
+        self.assertTrue(User.objects.get(pk=self.user.pk).has_perm('auth.view_group'))
+
+        self.editors.delete()
+        self.assertEqual(self.names(self.user), set())
+
+    def test_rebuild_command(self):
+        self.user.user_permissions.add(self.view_group)
+        EffectivePermission.objects.all().delete()
+        call_command('rebuild_effective_permissions', stdout=io.StringIO())
+        self.assertEqual(self.names(self.user), {'auth.view_group'})
+
+    def test_effective_permissions_endpoint(self):
+        self.user.user_permissions.add(self.view_group)
+        response = self.client.get(f'/api/auth/users/{self.user.pk}/effective_permissions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['permissions'], ['auth.view_group'])
+
+    def test_bulk_check(self):
+        superuser = User.objects.create_user('root', 'root@example.com', is_superuser=True)
+        inactive = User.objects.create_user('gone', 'gone@example.com', is_active=False)
+        for user in (self.user, inactive):
+            user.user_permissions.add(self.view_group)
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/auth/users/check_permissions/', {
+                'user_ids': [self.user.pk, superuser.pk, inactive.pk, 999],
+                'permissions': ['auth.view_group', 'auth.add_group'],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual(results[self.user.pk], {'auth.view_group': True, 'auth.add_group': False})
+        self.assertEqual(results[superuser.pk], {'auth.view_group': True, 'auth.add_group': True})
+        self.assertEqual(results[inactive.pk], {'auth.view_group': False, 'auth.add_group': False})
+        self.assertEqual(response.data['unknown_user_ids'], [999])
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post('/api/auth/users/check_permissions/', {
+            'user_ids': [self.user.pk], 'permissions': ['auth.view_group']
+        }, format='json').status_code, 403)
+
+
+class GroupMembershipTests(TestCase):
+    """
+    Tests for group counts and the paginated member listing.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.editors = Group.objects.create(name='Editors')
+        cls.empty = Group.objects.create(name='Empty')
+        cls.members = [User.objects.create_user(f'member-{i}', f'member-{i}@example.com') for i in range(5)]
+        cls.editors.user_set.add(*cls.members)
+        cls.editors.permissions.add(*Permission.objects.filter(codename__in=('view_group', 'change_group')))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_counts(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/auth/groups/', {'counts': 'true'})
+        counts = {group['name']: (group['member_count'], group['permission_count']) for group in response.data}
+        self.assertEqual(counts, {'Editors': (5, 2), 'Empty': (0, 0)})
+        self.assertNotIn('member_count', self.client.get('/api/auth/groups/').data[0])
+
+        # Membership changes do not touch groups, so counts are never served stale
+        self.editors.user_set.remove(self.members[0])
+        response = self.client.get('/api/auth/groups/', {'counts': 'true'})
+        self.assertEqual({group['name']: group['member_count'] for group in response.data}['Editors'], 4)
+
+    def test_members(self):
+        path = f'/api/auth/groups/{self.editors.pk}/members/'
+        response = self.client.get(path, {'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        usernames = [user['username'] for user in response.data['results']]
+        response = self.client.get(response.data['next'])
+        usernames += [user['username'] for user in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(sorted(usernames), sorted(user.username for user in self.members))
+
+        self.assertEqual(self.client.get(f'/api/auth/groups/{self.empty.pk}/members/').data['results'], [])
+        self.assertEqual(self.client.get('/api/auth/groups/999999/members/').status_code, 404)
+
+
+class GroupPermissionDiffTests(TestCase):
+    """
+    Tests for set-based changes to group permissions.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.member = User.objects.create_user('member', 'member@example.com')
+        cls.groups = [Group.objects.create(name=f'group-{i}') for i in range(10)]
+        cls.member.groups.add(cls.groups[0])
+        cls.view, cls.add, cls.change = (
+            Permission.objects.get(codename=f'{verb}_group').pk for verb in ('view', 'add', 'change')
+        )
+        cls.groups[0].permissions.add(cls.view)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def member_permissions(self):
+        return set(EffectivePermission.objects.filter(user=self.member).values_list('permission', flat=True))
+
+    def test_diff(self):
+        response = self.client.patch(
+            f'/api/auth/groups/{self.groups[0].pk}/permissions/',
+            {'add': [self.add, self.change, self.view], 'remove': []}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['added'], response.data['removed']), (2, 0))
+        response = self.client.patch(
+            f'/api/auth/groups/{self.groups[0].pk}/permissions/', {'remove': [self.view]}, format='json'
+        )
+        self.assertEqual((response.data['added'], response.data['removed']), (0, 1))
+        self.assertEqual(set(self.groups[0].permissions.values_list('pk', flat=True)), {self.add, self.change})
+        self.assertEqual(self.member_permissions(), {self.add, self.change})
+        self.assertTrue(User.objects.get(pk=self.member.pk).has_perm('auth.change_group'))
+
+    def test_invalid_diffs_are_rejected(self):
+        path = f'/api/auth/groups/{self.groups[0].pk}/permissions/'
+        self.assertEqual(self.client.patch(path, {}, format='json').status_code, 400)
+        response = self.client.patch(path, {'add': [self.add], 'remove': [self.add]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(path, {'add': [self.add, 999999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999999', str(response.data['add']))
+        self.assertEqual(self.member_permissions(), {self.view})
+
+    def test_assign_and_remove_reject_unknown_permissions(self):
+        for action in ('assign_permissions', 'remove_permissions'):
+            response = self.client.post(
+                f'/api/auth/groups/{self.groups[0].pk}/{action}/', {'permission_ids': [self.add, 999999]}, format='json'
+            )
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.data['missing_ids'], [999999])
+        self.assertEqual(list(self.groups[0].permissions.values_list('pk', flat=True)), [self.view])
+
+        self.client.post(
+            f'/api/auth/groups/{self.groups[0].pk}/assign_permissions/', {'permission_ids': [self.add]}, format='json'
+        )
+        self.assertEqual(self.member_permissions(), {self.add})
+
+    def test_assign_and_remove_validate_permission_ids(self):
+        path = f'/api/auth/groups/{self.groups[0].pk}/assign_permissions/'
+        for payload in ({}, {'permission_ids': []}, {'permission_ids': 5}, {'permission_ids': ['x']}):
+            self.assertEqual(self.client.post(path, payload, format='json').status_code, 400)
+        # Numeric strings are coerced, as they were before the set-based update
+        response = self.client.post(path, {'permission_ids': [str(self.add)]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.member_permissions(), {self.add})
+
+    def test_bulk(self):
+        def apply(groups):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch('/api/auth/groups/bulk_permissions/', {
+                    'group_ids': [group.pk for group in groups], 'add': [self.add, self.change], 'remove': [self.view],
+                }, format='json')
+            self.assertEqual(response.status_code, 200)
+            return response.data, len(queries)
+
+        data, few = apply(self.groups[:2])
+        self.assertEqual((data['groups'], data['added'], data['removed']), (2, 4, 1))
+        data, many = apply(self.groups)
+        self.assertEqual((data['groups'], data['added'], data['removed']), (10, 16, 0))
+        self.assertEqual(few, many)
+        self.assertEqual(self.member_permissions(), {self.add, self.change})
+
+        response = self.client.patch(
+            '/api/auth/groups/bulk_permissions/', {'group_ids': [999999], 'add': [self.add]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AuditLogTests(TestCase):
+    """
+    Tests for the buffered audit log and its query API.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.member = User.objects.create_user('member', 'member@example.com', 'old-secret-pass')
+        cls.group = Group.objects.create(name='Editors')
+        cls.permission = Permission.objects.get(codename='view_group')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_changes_are_recorded(self):
+        self.client.post(f'/api/auth/users/{self.member.pk}/assign_groups/', {'group_ids': [self.group.pk]}, format='json')
+        self.client.post(
+            f'/api/auth/groups/{self.group.pk}/assign_permissions/', {'permission_ids': [self.permission.pk]}, format='json'
+        )
+        self.client.post(
+            f'/api/auth/groups/{self.group.pk}/remove_permissions/', {'permission_ids': [self.permission.pk]}, format='json'
+        )
+        self.client.force_authenticate(self.member)
+        self.client.post('/api/auth/users/change_password/', {
+            'old_password': 'old-secret-pass', 'new_password': 'new-secret-pass', 'new_password2': 'new-secret-pass',
+        }, format='json')
+
+        events = list(AuditEvent.objects.order_by('id').values_list('actor', 'action', 'target_id', 'changes'))
+        self.assertEqual(events, [
+            (self.admin.pk, AuditEvent.USER_GROUPS_SET, self.member.pk, {'group_ids': [self.group.pk]}),
+            (self.admin.pk, AuditEvent.GROUP_PERMISSIONS_ASSIGNED, self.group.pk, {'permission_ids': [self.permission.pk]}),
+            (self.admin.pk, AuditEvent.GROUP_PERMISSIONS_REMOVED, self.group.pk, {'permission_ids': [self.permission.pk]}),
+            (self.member.pk, AuditEvent.USER_PASSWORD_CHANGED, self.member.pk, {}),
+        ])
+
+    def test_events_are_buffered(self):
+        request = APIRequestFactory().post('/')
+        request.user = self.admin
+        with self.assertNumQueries(0):
+            record_event(request, AuditEvent.USER_PASSWORD_CHANGED, AuditEvent.TARGET_USER, self.admin.pk)
+            record_event(request, AuditEvent.USER_PASSWORD_CHANGED, AuditEvent.TARGET_USER, self.member.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_events(), 2)
+        event = AuditEvent.objects.first()
+        self.assertEqual(event.ip_address, '127.0.0.1')
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_query_api(self):
+        now = timezone.now()
+        AuditEvent.objects.bulk_create([
+            AuditEvent(actor=self.admin, action=AuditEvent.USER_GROUPS_SET, target_type=AuditEvent.TARGET_USER,
+                       target_id=self.member.pk, occurred_at=now - timedelta(days=2)),
+            AuditEvent(actor=self.admin, action=AuditEvent.GROUP_PERMISSIONS_ASSIGNED,
+                       target_type=AuditEvent.TARGET_GROUP, target_id=self.group.pk, occurred_at=now),
+            AuditEvent(actor=None, action=AuditEvent.USER_PASSWORD_RESET, target_type=AuditEvent.TARGET_USER,
+                       target_id=self.member.pk, occurred_at=now),
+        ])
+
+        def actions(**params):
+            response = self.client.get('/api/auth/audit/', params)
+            self.assertEqual(response.status_code, 200)
+            return [event['action'] for event in response.data['results']]
+
+        self.assertEqual(actions(actor=self.admin.pk), [AuditEvent.GROUP_PERMISSIONS_ASSIGNED, AuditEvent.USER_GROUPS_SET])
+        self.assertEqual(
+            actions(target_type='user', target_id=self.member.pk),
+            [AuditEvent.USER_PASSWORD_RESET, AuditEvent.USER_GROUPS_SET]
+        )
+        self.assertEqual(
+            actions(target_type='user', since=(now - timedelta(days=1)).isoformat()), [AuditEvent.USER_PASSWORD_RESET]
+        )
+
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get('/api/auth/audit/').status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportTests(TestCase):
+    """
+    Tests for the bulk user import action.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        cls.group = Group.objects.create(name='Staff')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            '/api/auth/users/import/',
+            {'file': SimpleUploadedFile(name, content if isinstance(content, bytes) else content.encode()), **data},
+            format='multipart'
+        )
+
+    def test_import_csv(self):
+        password_hash = make_password('secret-pass', hasher='md5')
+        content = (
+            'username,email,password_hash,group_ids\n'
+            f'alice,alice@example.com,{password_hash},{self.group.pk}\n'
+            'bob,bob@example.com,,\n'
+            'admin,dup@example.com,,\n'
+            'carol,not-an-email,,\n'
+        )
+        response = self.upload('users.csv', content, chunk_size=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5])
+
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('secret-pass'))
+        self.assertEqual(list(alice.groups.all()), [self.group])
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+
+    def test_import_ndjson(self):
+        content = (
+            '{"username": "dave", "group_ids": [%d]}\n'
+            'not json\n'
+            '{"username": "erin", "group_ids": [999]}\n'
+        ) % self.group.pk
+        response = self.upload('users.ndjson', content)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertTrue(User.objects.get(username='dave').has_role('Staff'))
+
+    def test_import_reports_undecodable_rows(self):
+        content = b'username\nfrank\n\xff\xfe\ngrace\n'
+        response = self.upload('users.csv', content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3])
+
+        content = b'{"username": "heidi"}\n{"username": "\xff"}\n'
+        response = self.upload('users.ndjson', content)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2])
+
+    def test_import_requires_staff(self):
+        self.client.force_authenticate(User.objects.create_user('member'))
+        response = self.upload('users.csv', 'username\nfrank\n')
+        self.assertEqual(response.status_code, 403)
+
+
+class UserExportTests(TestCase):
+    """
+    Tests for the streaming user export action.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', is_staff=True)
+        staff, sales = Group.objects.create(name='Staff'), Group.objects.create(name='Sales')
+        User.objects.create_user('alice', 'alice@example.com').groups.set([staff, sales])
+        User.objects.create_user('bob', 'bob@example.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, file_format):
+        response = self.client.get('/api/auth/users/export/', {'file_format': file_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual([row['username'] for row in rows], ['admin', 'alice', 'bob'])
+        self.assertEqual(rows[1]['groups'], 'Sales;Staff')
+        self.assertEqual(rows[2]['groups'], '')
+
+    def test_export_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(rows[1]['groups'], ['Sales', 'Staff'])
+        self.assertEqual(rows[1]['email'], 'alice@example.com')
+
+
+class EmailOutboxTests(TestCase):
+    """
+    Tests for queued email delivery.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', 'member@example.com')
+
+    def setUp(self):
+        # Login and reset attempts count against the throttles
+        cache.clear()
+
+    def test_forgot_password_queues_email(self):
+        response = APIClient().post(
+            '/api/auth/users/forgot_password/', {'email': 'member@example.com'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('send_outbox', stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['member@example.com'])
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.STATUS_SENT)
+
+    def test_failed_email_is_retried_with_backoff(self):
+        enqueue_email('Subject', 'Body', ['member@example.com'])
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=OSError('connection refused')
+        ):
+            self.assertEqual(send_pending(max_attempts=2), (0, 1))
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, OutboxEmail.STATUS_PENDING)
+        self.assertEqual(email.last_error, 'connection refused')
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        # Not due yet
+        self.assertEqual(send_pending(), (0, 0))
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_connection_failure_backs_off_the_batch(self):
+        enqueue_email('Subject', 'Body', ['member@example.com'])
+        enqueue_email('Subject', 'Body', ['other@example.com'])
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.open',
+            side_effect=OSError('connection refused')
+        ):
+            self.assertEqual(send_pending(max_attempts=1), (0, 2))
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list('status', 'attempts', 'last_error')),
+            {(OutboxEmail.STATUS_FAILED, 1, 'connection refused')},
+        )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PasswordResetTests(TestCase):
+    """
+    Tests for hashed, expiring password reset tokens.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', 'member@example.com', 'old-secret-pass')
+
+    def setUp(self):
+        # Login and reset attempts count against the throttles
+        cache.clear()
+
+    def reset(self, reset_token):
+        return APIClient().post('/api/auth/users/reset_password/', {
+            'reset_token': reset_token,
+            'new_password': 'new-secret-pass',
+            'new_password2': 'new-secret-pass',
+        }, format='json')
+
+    def test_reset_password_with_emailed_token(self):
+        APIClient().post('/api/auth/users/forgot_password/', {'email': 'member@example.com'}, format='json')
+        send_pending()
+        reset_token = mail.outbox[0].body.rsplit('/', 1)[-1]
+        self.assertFalse(PasswordResetToken.objects.filter(token_hash=reset_token).exists())
+
+        self.assertEqual(self.reset(reset_token).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-secret-pass'))
+        # Tokens are single use
+        self.assertEqual(self.reset(reset_token).status_code, 400)
+
+    def test_expired_tokens_are_rejected_and_purged(self):
+        reset_token = PasswordResetToken.objects.issue(self.user)
+        PasswordResetToken.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.reset(reset_token).status_code, 400)
+
+        call_command('purge_reset_tokens', stdout=io.StringIO())
+        self.assertFalse(PasswordResetToken.objects.exists())
+
+
+class TokenRevocationTests(TestCase):
+    """
+    Tests for the refresh token revocation set and blacklist purge.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', 'member@example.com')
+
+    def setUp(self):
+        cache.clear()
+        self.refresh = UserTokenObtainPairSerializer.get_token(self.user)
+
+    def test_logout_revokes_without_blacklist_query(self):
+        response = APIClient().post('/api/auth/logout/', {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            with self.assertRaises(TokenError):
+                self.refresh.check_blacklist()
+
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_blacklist_is_still_checked_on_cache_miss(self):
+        self.refresh.blacklist()
+        cache.clear()
+        with self.assertRaises(TokenError):
+            self.refresh.check_blacklist()
+
+    def test_purge_tokens_deletes_expired_tokens(self):
+        self.refresh.blacklist()
+        UserTokenObtainPairSerializer.get_token(self.user)
+        OutstandingToken.objects.filter(jti=self.refresh['jti']).update(expires_at=timezone.now())
+
+        call_command('purge_tokens', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class GoogleOAuthTests(TestCase):
+    """
+    Tests for the Google OAuth views against a local stub server.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = SocialApp.objects.create(provider='google', name='Google', client_id='client', secret='secret')
+
+    def setUp(self):
+        cache.clear()
+        self.server = FakeOAuthServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        overrides = override_settings(**self.server.settings)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        close_session()
+        self.addCleanup(close_session)
+
+    def test_callback_creates_user_and_reuses_connection(self):
+        for _ in range(2):
+            response = APIClient().get('/api/auth/google/callback/', {'code': 'alice'})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('access_token', response.data)
+        self.assertEqual(User.objects.get(email='alice@example.com').first_name, 'Alice')
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_callback_reports_provider_errors(self):
+        response = APIClient().get('/api/auth/google/callback/', {'code': 'invalid'})
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(User.objects.filter(email='invalid@example.com').exists())
+
+    def test_configuration_is_cached_until_changed(self):
+        self.assertEqual(get_google_app().client_id, 'client')
+        with self.assertNumQueries(0):
+            response = APIClient().get('/api/auth/google/')
+        self.assertIn('client_id=client', response.data['auth_url'])
+
+        self.app.client_id = 'rotated'
+        self.app.save()
+        self.assertEqual(get_google_app().client_id, 'rotated')
+
+    async def test_async_callback_creates_user(self):
+        view = AsyncGoogleCallbackView.as_view()
+        response = await view(AsyncRequestFactory().get('/api/auth/google/callback/', {'code': 'bob'}))
+        await aclose_async_client()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access_token', json.loads(response.content))
+        self.assertTrue(await User.objects.filter(email='bob@example.com').aexists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ThrottleTests(TestCase):
+    """
+    Tests for the brute-force throttles on login and password recovery.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', 'member@example.com', 'secret-pass')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username, address='10.0.0.1'):
+        return APIClient().post(
+            '/api/auth/login/', {'username': username, 'password': 'wrong-pass'},
+            format='json', REMOTE_ADDR=address
+        )
+
+    def test_username_throttle_spans_addresses(self):
+        for i in range(5):
+            self.assertEqual(self.login('member', f'10.0.0.{i}').status_code, 401)
+        # Rejected before the user is looked up or a password hashed
+        with self.assertNumQueries(0):
+            response = self.login('Member', '10.0.1.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(self.login('someone-else', '10.0.1.1').status_code, 401)
+
+    def test_address_throttle_spans_usernames(self):
+        for i in range(20):
+            self.assertEqual(self.login(f'user-{i}').status_code, 401)
+        self.assertEqual(self.login('member').status_code, 429)
+        self.assertEqual(self.login('member', '10.0.0.2').status_code, 401)
+
+    def test_previous_window_is_weighted(self):
+        throttle = LoginUsernameRateThrottle()
+        key = throttle.get_field_cache_key('member')
+        throttle.timer = lambda: 30.0
+        for _ in range(5):
+            self.assertTrue(throttle.consume(key))
+        self.assertFalse(throttle.consume(key))
+        # Half of the previous window still counts: 2.5 of 5
+        throttle.timer = lambda: 90.0
+        for _ in range(3):
+            self.assertTrue(throttle.consume(key))
+        self.assertFalse(throttle.consume(key))
+        self.assertEqual(throttle.wait(), 6)
+
+    def test_forgot_password(self):
+        client = APIClient()
+        for _ in range(3):
+            response = client.post('/api/auth/users/forgot_password/', {'email': 'member@example.com'}, format='json')
+            self.assertEqual(response.status_code, 200)
+        response = client.post('/api/auth/users/forgot_password/', {'email': 'MEMBER@example.com'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+
+    async def test_async_login(self):
+        view = AsyncUserLoginView.as_view()
+        factory = AsyncRequestFactory()
+        for _ in range(5):
+            response = await view(factory.post(
+                '/api/auth/login/', {'username': 'member', 'password': 'wrong-pass'}, content_type='application/json'
+            ))
+            self.assertEqual(response.status_code, 401)
+        response = await view(factory.post(
+            '/api/auth/login/', {'username': 'member', 'password': 'secret-pass'}, content_type='application/json'
+        ))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'User.hashers.TunedScryptPasswordHasher',
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+])
+class PasswordHasherTests(TestCase):
+    """
+    Tests for the preferred hasher and transparent rehashing on login.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', 'member@example.com')
+        User.objects.filter(pk=cls.user.pk).update(password=make_password('secret-pass', hasher='md5'))
+
+    def setUp(self):
+        # Login and reset attempts count against the throttles
+        cache.clear()
+
+    def test_login_upgrades_legacy_hash(self):
+        response = APIClient().post(
+            '/api/auth/login/', {'username': 'member', 'password': 'secret-pass'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+        self.assertIn('$1$', self.user.password)
+
+    async def test_async_login_upgrades_legacy_hash(self):
+        view = AsyncUserLoginView.as_view()
+        factory = AsyncRequestFactory()
+        response = await view(factory.post(
+            '/api/auth/login/', {'username': 'member', 'password': 'wrong-pass'}, content_type='application/json'
+        ))
+        self.assertEqual(response.status_code, 401)
+
+        response = await view(factory.post(
+            '/api/auth/login/', {'username': 'member', 'password': 'secret-pass'}, content_type='application/json'
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', json.loads(response.content))
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('scrypt$'))
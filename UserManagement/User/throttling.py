@@ -0,0 +1,138 @@
+import hashlib
+import math
+
+from django.contrib.auth import get_user_model
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+# Get the User model
+User = get_user_model()
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Rate throttle over a sliding window approximated from two fixed-window
+    counters: the count of the previous window, weighted by how much of it
+    still overlaps the sliding window, plus the count of the current one.
+    Unlike SimpleRateThrottle, which keeps the timestamp of every request,
+    each check costs one cache read and one increment whatever the rate.
+    Rejected requests are not counted.
+    """
+    def get_rate(self):
+        # Read per instance rather than at import, so rates follow settings overrides
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self.consume(self.key)
+
+    def consume(self, key):
+        """
+        Count a request against key, unless the rate has been reached.
+        """
+        position = self.timer() / self.duration
+        window = int(position)
+        elapsed = position - window
+        current_key, previous_key = f'{key}:{window}', f'{key}:{window - 1}'
+
+        counts = self.cache.get_many([previous_key, current_key])
+        previous, current = counts.get(previous_key, 0), counts.get(current_key, 0)
+        if previous * (1 - elapsed) + current >= self.num_requests:
+            self.wait_seconds = self.get_wait(previous, current, elapsed)
+            return False
+
+        try:
+            self.cache.incr(current_key)
+        except ValueError:
+            # Kept for two windows, as it is read as the previous window next
+            if not self.cache.add(current_key, 1, self.duration * 2):
+                self.cache.incr(current_key)
+        return True
+
+    def get_wait(self, previous, current, elapsed):
+        """
+        Seconds until the weighted count drops below the rate, assuming no
+        further requests are let through.
+        """
+        if current < self.num_requests:
+            # The previous window's weight decays within the current window
+            until = 1 - (self.num_requests - current) / previous
+        elif current:
+            # The current window has to become the previous one and decay in turn
+            until = 2 - self.num_requests / current
+        else:
+            # A rate of zero requests
+            until = 2
+        return max(until - elapsed, 0) * self.duration
+
+    def wait(self):
+        return max(math.ceil(self.wait_seconds), 1)
+
+
+class IPRateThrottle(SlidingWindowRateThrottle):
+    """
+    Throttle requests per client IP address.
+    """
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class FieldRateThrottle(SlidingWindowRateThrottle):
+    """
+    Throttle requests per value of a request body field, such as the
+    account a login attempt targets, whichever client sends them.
+    Requests without the field are left to the other throttles.
+    """
+    field = None
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        return self.get_field_cache_key(data.get(self.field) if hasattr(data, 'get') else None)
+
+    def get_field_cache_key(self, value):
+        if not isinstance(value, str) or not value.strip():
+            return None
+        # Hashed, as cache keys may not hold arbitrary characters
+        ident = hashlib.sha1(value.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginRateThrottle(IPRateThrottle):
+    scope = 'login'
+
+
+class LoginUsernameRateThrottle(FieldRateThrottle):
+    scope = 'login_username'
+    field = User.USERNAME_FIELD
+
+
+class PasswordResetRateThrottle(IPRateThrottle):
+    scope = 'password_reset'
+
+
+class PasswordResetEmailRateThrottle(FieldRateThrottle):
+    scope = 'password_reset_email'
+    field = 'email'
+
+
+def check_login_throttles(request, username):
+    """
+    Apply the login throttles to a request handled outside DRF (the async
+    login view). Returns the seconds to wait, or None when the request is allowed.
+    """
+    address = LoginRateThrottle()
+    account = LoginUsernameRateThrottle()
+    waits = [
+        throttle.wait()
+        for throttle, key in (
+            (address, address.get_cache_key(request, None)),
+            (account, account.get_field_cache_key(username)),
+        )
+        if throttle.rate is not None and key is not None and not throttle.consume(key)
+    ]
+    return max(waits) if waits else None
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+from .authentication import get_issued_at, is_token_revoked
+
+REVOKED_TOKEN_KEY = 'jwt:revoked:jti:{}'
+
+
+class RevocationAwareRefreshToken(RefreshToken):
+    """
+    Refresh token that consults the cached revocation set before the blacklist tables.
+    Revoked tokens are rejected without a query; the blacklist tables stay the
+    source of truth for anything the cache has not seen or has evicted.
+    """
+    def check_blacklist(self):
+        if is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+        super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        remember_revoked(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
+
+
+class ClaimsRefreshToken(RevocationAwareRefreshToken):
+    """
+    Refresh token for the refresh endpoint, whose access tokens copy its
+    claims (staff status, roles). Refused once the user's tokens have been
+    revoked, so a user whose privileges changed has to log in again.
+    """
+    def verify(self):
+        super().verify()
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None and is_token_revoked(user_id, get_issued_at(self.payload)):
+            raise TokenError(_("Token is revoked"))
+
+
+def remember_revoked(jti, exp):
+    """
+    Add a token to the revocation set until it would have expired anyway.
+    """
+    remaining = (datetime_from_epoch(exp) - aware_utcnow()).total_seconds()
+    if remaining > 0:
+        cache.set(REVOKED_TOKEN_KEY.format(jti), True, remaining)
+
+
+def is_revoked(jti):
+    return cache.get(REVOKED_TOKEN_KEY.format(jti), False)
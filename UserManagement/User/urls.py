@@ -1,19 +1,27 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, GroupViewSet, PermissionViewSet,
-    UserLoginView, UserLogoutView,GoogleLoginRedirect,GoogleCallbackView
+    UserLoginView, UserLogoutView,GoogleLoginRedirect,GoogleCallbackView,
+    AsyncGoogleCallbackView, AsyncUserLoginView, MetricsView, AuditEventViewSet
 )
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'groups', GroupViewSet, basename='group')
 router.register(r'permissions', PermissionViewSet, basename='permission')
+router.register(r'audit', AuditEventViewSet, basename='audit')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('login/', UserLoginView.as_view(), name='login'),
+    path('login/', (
+        AsyncUserLoginView if settings.ASYNC_AUTH_VIEWS else UserLoginView
+    ).as_view(), name='login'),
     path('logout/', UserLogoutView.as_view(), name='logout'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('google/', GoogleLoginRedirect.as_view()),
-    path('google/callback/', GoogleCallbackView.as_view()),
+    path('google/callback/', (
+        AsyncGoogleCallbackView if settings.ASYNC_AUTH_VIEWS else GoogleCallbackView
+    ).as_view()),
 ]
@@ -1,29 +1,63 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
-from django.core.mail import send_mail
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.utils.crypto import get_random_string
+from django.db.models import Count, OuterRef, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from allauth.socialaccount.models import SocialApp
 from urllib.parse import urlencode
+import json
+from functools import partial
+import httpx
 import requests
 from .serializers import (
-    UserRegistrationSerializer, UserSerializer, GroupSerializer,
+    UserRegistrationSerializer, UserSerializer, GroupSerializer, GroupCountsSerializer,
     ChangePasswordSerializer, ForgotPasswordSerializer, ResetPasswordSerializer,
-    PermissionSerializer
+    PermissionSerializer, UserTokenObtainPairSerializer, BulkGroupAssignmentSerializer,
+    PermissionCheckSerializer, AuditEventSerializer, GroupPermissionDiffSerializer,
+    BulkGroupPermissionDiffSerializer, GroupPermissionIdsSerializer, find_missing_ids
 )
+from .audit import record_event
+from .authentication import get_user_instance
+from .bulk import (
+    DEFAULT_CHUNK_SIZE, EXPORT_ENCODERS, MAX_CHUNK_SIZE, assign_groups, get_file_format,
+    import_users, iter_export_rows, iter_import_rows, update_group_permissions
+)
+from .catalogue import filter_catalogue, get_permission_catalogue
+from .conditional import conditional_response, group_validators, make_etag, user_validators
+from .filters import AuditEventFilter, UserFilter, UserOrderingFilter
+from .hashers import acheck_password, amake_password
+from .instrumentation import registry
+from .models import AuditEvent, EffectivePermission, PasswordResetToken
+from .oauth import get_async_client, get_google_app, get_session
+from .outbox import enqueue_email
+from .pagination import AuditEventCursorPagination, UserCursorPagination
+from .representations import get_group_list, get_user_representation
+from .permission_matrix import check_permissions
+from .throttling import (
+    LoginRateThrottle, LoginUsernameRateThrottle, PasswordResetEmailRateThrottle,
+    PasswordResetRateThrottle, check_login_throttles
+)
+from .tokens import RevocationAwareRefreshToken
 
 # Get the User model
 User = get_user_model()
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or obj == request.user
+        return request.user.is_staff or obj.pk == request.user.pk
 
 class GroupViewSet(viewsets.ModelViewSet):
     """
@@ -34,32 +68,100 @@ class GroupViewSet(viewsets.ModelViewSet):
     serializer_class = GroupSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    def wants_counts(self):
+        return self.request.query_params.get('counts', '').lower() in ('1', 'true', 'yes')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.wants_counts():
+            return GroupCountsSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' and self.wants_counts():
+            queryset = queryset.annotate(
+                member_count=self.count_rows(User.groups.through),
+                permission_count=self.count_rows(Group.permissions.through),
+            )
+        return queryset
+
+    @staticmethod
+    def count_rows(through):
+        """
+        Correlated count of a through table's rows for each group, read from
+        its group_id index. Unlike Count() over joins, members and permissions
+        are not multiplied together.
+        """
+        return Coalesce(Subquery(
+            through.objects.filter(group=OuterRef('pk')).order_by().values('group')
+            .annotate(count=Count('*')).values('count')
+        ), 0)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List groups; answers 304 while no group has changed since the client's copy.
+        The serialized list is shared through the cache until a group changes.
+        With counts=true, member and permission counts are added with one
+        aggregate query. As memberships change without touching groups, that
+        list is never cached.
+        """
+        if self.wants_counts():
+            return super().list(request, *args, **kwargs)
+        return conditional_response(
+            request, *group_validators(request),
+            lambda: Response(get_group_list(
+                lambda: self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data
+            ))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request, *group_validators(request), partial(super().retrieve, request, *args, **kwargs)
+        )
+
+    @action(detail=True, methods=['get'])
+    def members(self, request, pk=None):
+        """
+        Custom action for listing the members of a group a page at a time.
+        Members are found through the membership table's group index and
+        paginated like the user listing.
+        """
+        group = self.get_object()
+        paginator = UserCursorPagination()
+        page = paginator.paginate_queryset(User.objects.filter(groups=group), request, view=self)
+        # Load nested groups for the whole page in one extra query
+        prefetch_related_objects(page, 'groups')
+        return paginator.get_paginated_response(
+            UserSerializer(page, many=True, context=self.get_serializer_context()).data
+        )
+
     @action(detail=True, methods=['post'])
     def assign_permissions(self, request, pk=None):
         """
         Custom action for assigning permissions to a group.
         Replaces all existing permissions with the new ones.
         """
-        permission_ids = request.data.get('permission_ids')
-        if not permission_ids:
-            return Response(
-                {"error": "permission_ids is required"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        try:
-            group = self.get_object()
-            permissions = Permission.objects.filter(id__in=permission_ids)
-            group.permissions.set(permissions)
-            return Response(
-                {"message": "Permissions assigned successfully"},
-                status=status.HTTP_200_OK
-            )
-        except Permission.DoesNotExist:
+        serializer = GroupPermissionIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        group = self.get_object()
+        permission_ids = sorted(set(serializer.validated_data['permission_ids']))
+        missing = find_missing_ids(Permission, permission_ids)
+        if missing:
             return Response(
-                {"error": "One or more permissions not found"},
+                {"error": "One or more permissions not found", "missing_ids": missing},
                 status=status.HTTP_404_NOT_FOUND
             )
+        update_group_permissions([group.pk], add=permission_ids, replace=True)
+        record_event(
+            request, AuditEvent.GROUP_PERMISSIONS_ASSIGNED, AuditEvent.TARGET_GROUP, group.pk,
+            permission_ids=permission_ids
+        )
+        return Response(
+            {"message": "Permissions assigned successfully"},
+            status=status.HTTP_200_OK
+        )
 
     @action(detail=True, methods=['post'])
     def remove_permissions(self, request, pk=None):
@@ -67,26 +169,70 @@ class GroupViewSet(viewsets.ModelViewSet):
         Custom action for removing permissions from a group.
         Removes only the specified permissions while keeping others intact.
         """
-        permission_ids = request.data.get('permission_ids')
-        if not permission_ids:
-            return Response(
-                {"error": "permission_ids is required"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        try:
-            group = self.get_object()
-            permissions = Permission.objects.filter(id__in=permission_ids)
-            group.permissions.remove(*permissions)
+        serializer = GroupPermissionIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        group = self.get_object()
+        permission_ids = sorted(set(serializer.validated_data['permission_ids']))
+        missing = find_missing_ids(Permission, permission_ids)
+        if missing:
             return Response(
-                {"message": "Permissions removed successfully"},
-                status=status.HTTP_200_OK
-            )
-        except Permission.DoesNotExist:
-            return Response(
-                {"error": "One or more permissions not found"},
+                {"error": "One or more permissions not found", "missing_ids": missing},
                 status=status.HTTP_404_NOT_FOUND
             )
+        update_group_permissions([group.pk], remove=permission_ids)
+        record_event(
+            request, AuditEvent.GROUP_PERMISSIONS_REMOVED, AuditEvent.TARGET_GROUP, group.pk,
+            permission_ids=permission_ids
+        )
+        return Response(
+            {"message": "Permissions removed successfully"},
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['patch'], url_path='permissions')
+    def update_permissions(self, request, pk=None):
+        """
+        Custom action for granting and revoking permissions of a group in one request.
+        Permissions in add are granted and those in remove revoked; others are kept.
+        """
+        group = self.get_object()
+        serializer = GroupPermissionDiffSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        counts = update_group_permissions([group.pk], add=data['add'], remove=data['remove'])
+        record_event(
+            request, AuditEvent.GROUP_PERMISSIONS_UPDATED, AuditEvent.TARGET_GROUP, group.pk,
+            add=data['add'], remove=data['remove'], **counts
+        )
+        return Response({
+            "message": "Permissions updated successfully",
+            **counts,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['patch'])
+    def bulk_permissions(self, request):
+        """
+        Custom action for granting and revoking the same permissions on many groups at once.
+        """
+        serializer = BulkGroupPermissionDiffSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        counts = update_group_permissions(data['group_ids'], add=data['add'], remove=data['remove'])
+        record_event(
+            request, AuditEvent.GROUPS_PERMISSIONS_BULK_UPDATED, AuditEvent.TARGET_GROUP,
+            group_ids=data['group_ids'], add=data['add'], remove=data['remove'], **counts
+        )
+        return Response({
+            "message": "Permissions updated successfully",
+            "groups": len(data['group_ids']),
+            **counts,
+        }, status=status.HTTP_200_OK)
 
 class UserViewSet(viewsets.ModelViewSet):
     """
@@ -96,22 +242,54 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UserCursorPagination
+    filter_backends = [DjangoFilterBackend, UserOrderingFilter]
+    filterset_class = UserFilter
+    # Only indexed columns
+    ordering_fields = ('date_joined', 'username', 'email')
+    ordering = UserCursorPagination.ordering
 
     def get_permissions(self):
         """
-        Override to allow registration without authentication.
+        Override to allow registration and password recovery without authentication.
         """
-        if self.action == 'register':
+        if self.action in ('register', 'forgot_password', 'reset_password'):
             return [permissions.AllowAny()]
         return super().get_permissions()
 
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return User.objects.all()
-        elif user.groups.filter(name="Manager").exists():
-            return User.objects.exclude(is_superuser=True)
-        return User.objects.filter(id=user.id)
+            queryset = User.objects.all()
+        elif user.has_role("Manager"):
+            queryset = User.objects.exclude(is_superuser=True)
+        else:
+            queryset = User.objects.filter(id=user.id)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        List users a page at a time. The page's ETag is computed before its
+        groups are loaded and serialized, so an unchanged page costs one query.
+        """
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+
+        def get_response():
+            # Load nested groups for the whole page in one extra query
+            prefetch_related_objects(page, 'groups')
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+        links = (self.paginator.get_next_link(), self.paginator.get_previous_link())
+        return conditional_response(
+            request, *user_validators(request, page, last_modified=False, links=links), get_response
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_response(
+            request, *user_validators(request, [instance]),
+            lambda: Response(get_user_representation(instance, lambda: self.get_serializer(instance).data))
+        )
 
 
     @action(detail=False, methods=['post'])
@@ -131,8 +309,11 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def me(self, request):
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        user = get_user_instance(request.user)
+        return conditional_response(
+            request, *user_validators(request, [user]),
+            lambda: Response(get_user_representation(user, lambda: self.get_serializer(user).data))
+        )
 
     @action(detail=True, methods=['post'])
     def assign_groups(self, request, pk=None):
@@ -154,6 +335,10 @@ class UserViewSet(viewsets.ModelViewSet):
         try:
             groups = Group.objects.filter(id__in=group_ids)
             user.groups.set(groups)
+            record_event(
+                request, AuditEvent.USER_GROUPS_SET, AuditEvent.TARGET_USER, user.pk,
+                group_ids=sorted(group.pk for group in groups)
+            )
             return Response(
                 {"message": "Groups assigned successfully"},
                 status=status.HTTP_200_OK
@@ -164,6 +349,150 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=True, methods=['get'])
+    def effective_permissions(self, request, pk=None):
+        """
+        Custom action listing the permissions a user holds, directly or through groups.
+        Active superusers implicitly hold every permission.
+        """
+        user = self.get_object()
+        permissions = EffectivePermission.objects.filter(user=user).order_by('name').values_list('name', flat=True)
+        return Response({
+            "user": user.pk,
+            "is_active": user.is_active,
+            "is_superuser": user.is_superuser,
+            "permissions": list(permissions),
+        })
+
+    # Not named check_permissions, which would override APIView.check_permissions
+    @action(detail=False, methods=['post'], url_path='check_permissions')
+    def bulk_check_permissions(self, request):
+        """
+        Custom action checking many permissions of many users in one call.
+        Returns, per user, whether each permission is granted.
+        """
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Only admin users can check permissions of other users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = PermissionCheckSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user_ids = serializer.validated_data['user_ids']
+        results = check_permissions(user_ids, serializer.validated_data['permissions'])
+        return Response({
+            "results": results,
+            "unknown_user_ids": sorted(set(user_ids) - set(results)),
+        })
+
+    @action(detail=False, methods=['post'])
+    def bulk_assign_groups(self, request):
+        """
+        Custom action for adding, removing or replacing the groups of many users at once.
+        Users are selected by id, by a filter or all at once; the memberships
+        are changed with set-based statements in a single transaction.
+        """
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Only admin users can assign groups"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = BulkGroupAssignmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        if 'user_ids' in data:
+            users = User.objects.filter(id__in=data['user_ids'])
+        elif 'filter' in data:
+            users = data['filter']
+        else:
+            users = User.objects.all()
+        # Counted first, since the change may alter which users a filter matches
+        matched = users.count()
+        counts = assign_groups(users, data['group_ids'], data['mode'])
+        if 'user_ids' in data:
+            selection = {'user_ids': data['user_ids']}
+        elif 'filter' in data:
+            selection = {'filter': request.data['filter']}
+        else:
+            selection = {'all': True}
+        record_event(
+            request, AuditEvent.USERS_GROUPS_BULK_UPDATED, AuditEvent.TARGET_USER,
+            mode=data['mode'], group_ids=data['group_ids'], users=matched, **selection, **counts
+        )
+        return Response({
+            "message": "Groups updated successfully",
+            "users": matched,
+            **counts,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_users(self, request):
+        """
+        Custom action for importing users in bulk from a CSV or NDJSON upload.
+        Rows are validated and inserted in chunks; invalid rows are reported
+        without aborting the import.
+        """
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Only admin users can import users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {"error": "file is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = get_file_format(upload, request.data.get('file_format'))
+        if not file_format:
+            return Response(
+                {"error": "file_format must be one of: csv, ndjson"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            chunk_size = int(request.data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = DEFAULT_CHUNK_SIZE
+        chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+
+        report = import_users(iter_import_rows(upload, file_format), chunk_size=chunk_size)
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Custom action for exporting all users as a CSV or NDJSON stream.
+        Rows are encoded as they are read, so memory does not grow with the user count.
+        """
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Only admin users can export users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_ENCODERS:
+            return Response(
+                {"error": "file_format must be one of: csv, ndjson"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        encode, content_type = EXPORT_ENCODERS[file_format]
+        response = StreamingHttpResponse(
+            encode(iter_export_rows(User.objects.all())), content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="users.{file_format}"'
+        return response
+
     @action(detail=False, methods=['post'])
     def change_password(self, request):
         """
@@ -172,16 +501,19 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         serializer = ChangePasswordSerializer(data=request.data)
         if serializer.is_valid():
+            user = get_user_instance(request.user)
+
             # Check old password
-            if not request.user.check_password(serializer.validated_data['old_password']):
+            if not user.check_password(serializer.validated_data['old_password']):
                 return Response(
                     {"old_password": ["Wrong password."]}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
             # Set new password
-            request.user.set_password(serializer.validated_data['new_password'])
-            request.user.save()
+            user.set_password(serializer.validated_data['new_password'])
+            user.save()
+            record_event(request, AuditEvent.USER_PASSWORD_CHANGED, AuditEvent.TARGET_USER, user.pk)
             
             return Response(
                 {"message": "Password changed successfully"}, 
@@ -189,11 +521,12 @@ class UserViewSet(viewsets.ModelViewSet):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'],
+            throttle_classes=[PasswordResetRateThrottle, PasswordResetEmailRateThrottle])
     def forgot_password(self, request):
         """
         Custom action for handling forgot password requests.
-        Generates a reset token and sends it via email.
+        Generates a reset token and queues it for delivery via email.
         """
         serializer = ForgotPasswordSerializer(data=request.data)
         if serializer.is_valid():
@@ -201,18 +534,14 @@ class UserViewSet(viewsets.ModelViewSet):
             try:
                 user = User.objects.get(email=email)
                 # Generate reset token
-                reset_token = get_random_string(length=32)
-                user.reset_token = reset_token
-                user.save()
+                reset_token = PasswordResetToken.objects.issue(user)
                 
-                # Send email with reset link
+                # Queue email with reset link for the outbox worker
                 reset_link = f"{settings.FRONTEND_URL}/reset-password/{reset_token}"
-                send_mail(
+                enqueue_email(
                     'Password Reset Request',
                     f'Click the following link to reset your password: {reset_link}',
-                    settings.EMAIL_HOST_USER,
                     [email],
-                    fail_silently=False,
                 )
                 
                 return Response(
@@ -226,7 +555,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=[PasswordResetRateThrottle])
     def reset_password(self, request):
         """
         Custom action for resetting password using the reset token.
@@ -237,25 +566,76 @@ class UserViewSet(viewsets.ModelViewSet):
             reset_token = serializer.validated_data['reset_token']
             new_password = serializer.validated_data['new_password']
             
-            try:
-                user = User.objects.get(reset_token=reset_token)
-                user.set_password(new_password)
-                user.reset_token = None  # Clear the reset token
-                user.save()
-                
-                return Response(
-                    {"message": "Password has been reset successfully"},
-                    status=status.HTTP_200_OK
-                )
-            except User.DoesNotExist:
+            token = PasswordResetToken.objects.get_valid(reset_token)
+            if token is None:
                 return Response(
                     {"error": "Invalid reset token"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+
+            user = token.user
+            user.set_password(new_password)
+            user.save()
+            user.reset_tokens.all().delete()  # Clear the reset tokens
+            record_event(request, AuditEvent.USER_PASSWORD_RESET, AuditEvent.TARGET_USER, user.pk)
+            
+            return Response(
+                {"message": "Password has been reset successfully"},
+                status=status.HTTP_200_OK
+            )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class UserLoginView(TokenObtainPairView):
     permission_classes = [permissions.AllowAny]
+    serializer_class = UserTokenObtainPairSerializer
+    # Checked before the credentials are looked up or hashed
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncUserLoginView(View):
+    """
+    Async variant of UserLoginView for ASGI deployments.
+    Password hashing runs in a thread pool instead of the event loop, so
+    concurrent logins are hashed in parallel. Enabled with the ASYNC_AUTH_VIEWS setting.
+    """
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = {}
+        username = data.get(User.USERNAME_FIELD) if isinstance(data, dict) else None
+        password = data.get('password') if isinstance(data, dict) else None
+
+        wait = await sync_to_async(check_login_throttles)(request, username)
+        if wait is not None:
+            response = JsonResponse({"detail": Throttled(wait).detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            response['Retry-After'] = str(wait)
+            return response
+
+        if not isinstance(username, str) or not isinstance(password, str):
+            return JsonResponse(
+                {"error": "username and password are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            user = await User._default_manager.aget_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords
+            await amake_password(password)
+            user = None
+
+        if user is None or not await acheck_password(user, password) or not user.is_active:
+            return JsonResponse(
+                {"detail": "No active account found with the given credentials"},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        refresh = await sync_to_async(UserTokenObtainPairSerializer.get_token)(user)
+        return JsonResponse({
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        })
 
 class UserLogoutView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -271,7 +651,7 @@ class UserLogoutView(APIView):
                 )
             
             # Blacklist the refresh token
-            token = RefreshToken(refresh_token)
+            token = RevocationAwareRefreshToken(refresh_token)
             token.blacklist()
             
             return Response(
@@ -284,15 +664,57 @@ class UserLogoutView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class MetricsView(APIView):
+    """
+    Aggregated request metrics of this process, per view.
+    GET returns the histogram, DELETE resets it. Staff only.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(registry.snapshot())
+
+    def delete(self, request, *args, **kwargs):
+        registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for AuditEvent model operations.
+    Provides read-only, paginated access to the audit log for staff users.
+    """
+    queryset = AuditEvent.objects.all()
+    serializer_class = AuditEventSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = AuditEventCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AuditEventFilter
+
 class PermissionViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Permission model operations.
     Provides read-only access to permissions and custom actions for permission management.
     """
-    queryset = Permission.objects.all()
+    queryset = Permission.objects.select_related('content_type')
     serializer_class = PermissionSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    def list(self, request, *args, **kwargs):
+        """
+        List permissions from the cached catalogue.
+        Supports filtering by content type with app_label and model.
+        """
+        catalogue = get_permission_catalogue()
+
+        def get_response():
+            return Response(filter_catalogue(
+                catalogue['permissions'],
+                app_label=request.query_params.get('app_label'),
+                model=request.query_params.get('model'),
+            ))
+
+        return conditional_response(request, make_etag(request, catalogue['version']), None, get_response)
+
 class GoogleLoginRedirect(APIView):
     """
     View to initiate Google OAuth2 login flow.
@@ -302,7 +724,7 @@ class GoogleLoginRedirect(APIView):
 
     def get(self, request):
         try:
-            app = SocialApp.objects.get(provider='google')
+            app = get_google_app()
             params = {
                 "client_id": app.client_id,
                 "redirect_uri": request.build_absolute_uri('/api/auth/google/callback/'),
@@ -311,7 +733,7 @@ class GoogleLoginRedirect(APIView):
                 "access_type": "offline",
                 "prompt": "consent"
             }
-            url = f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
+            url = f"{settings.GOOGLE_OAUTH_AUTH_URL}?{urlencode(params)}"
             return Response({"auth_url":url})
         except SocialApp.DoesNotExist:
             return Response(
@@ -335,7 +757,7 @@ class GoogleCallbackView(APIView):
             )
 
         try:
-            app = SocialApp.objects.get(provider="google")
+            app = get_google_app()
             data = {
                 "code": code,
                 "client_id": app.client_id,
@@ -345,7 +767,10 @@ class GoogleCallbackView(APIView):
             }
 
             # Exchange code for token
-            token_response = requests.post("https://oauth2.googleapis.com/token", data=data)
+            session = get_session()
+            token_response = session.post(
+                settings.GOOGLE_OAUTH_TOKEN_URL, data=data, timeout=settings.GOOGLE_OAUTH_TIMEOUT
+            )
             token_response.raise_for_status()  # Raise exception for bad status codes
             token_data = token_response.json()
 
@@ -357,9 +782,10 @@ class GoogleCallbackView(APIView):
                 )
 
             # Get user info from Google
-            user_info_response = requests.get(
-                "https://www.googleapis.com/oauth2/v3/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}
+            user_info_response = session.get(
+                settings.GOOGLE_OAUTH_USERINFO_URL,
+                headers={"Authorization": f"Bearer {access_token}"},
+                timeout=settings.GOOGLE_OAUTH_TIMEOUT
             )
             user_info_response.raise_for_status()
             user_info = user_info_response.json()
@@ -381,7 +807,7 @@ class GoogleCallbackView(APIView):
             )
 
             # Create JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserTokenObtainPairSerializer.get_token(user)
             access = str(refresh.access_token)
             refresh = str(refresh)
 
@@ -412,4 +838,96 @@ class GoogleCallbackView(APIView):
             return Response(
                 {"error": f"An unexpected error occurred: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+class AsyncGoogleCallbackView(View):
+    """
+    Async variant of GoogleCallbackView for ASGI deployments.
+    Waits on Google without holding a worker thread, so one worker can
+    serve many concurrent logins. Enabled with the ASYNC_AUTH_VIEWS setting.
+    """
+    async def get(self, request):
+        code = request.GET.get("code")
+
+        if not code:
+            return JsonResponse(
+                {"error": "No authorization code provided"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            app = await sync_to_async(get_google_app)()
+            data = {
+                "code": code,
+                "client_id": app.client_id,
+                "client_secret": app.secret,
+                "redirect_uri": request.build_absolute_uri('/api/auth/google/callback/'),
+                "grant_type": "authorization_code"
+            }
+
+            # Exchange code for token
+            client = get_async_client()
+            token_response = await client.post(settings.GOOGLE_OAUTH_TOKEN_URL, data=data)
+            token_response.raise_for_status()
+            token_data = token_response.json()
+
+            access_token = token_data.get("access_token")
+            if not access_token:
+                return JsonResponse(
+                    {"error": "Failed to obtain access token"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Get user info from Google
+            user_info_response = await client.get(
+                settings.GOOGLE_OAUTH_USERINFO_URL,
+                headers={"Authorization": f"Bearer {access_token}"}
+            )
+            user_info_response.raise_for_status()
+            user_info = user_info_response.json()
+
+            if not user_info.get("email"):
+                return JsonResponse(
+                    {"error": "Email not provided by Google"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Create or update user
+            user, created = await User.objects.aget_or_create(
+                email=user_info["email"],
+                defaults={
+                    "username": user_info["email"].split("@")[0],
+                    "first_name": user_info.get("given_name", ""),
+                    "last_name": user_info.get("family_name", "")
+                }
+            )
+
+            # Create JWT tokens
+            refresh = await sync_to_async(UserTokenObtainPairSerializer.get_token)(user)
+
+            return JsonResponse({
+                "code": code,
+                "access_token": str(refresh.access_token),
+                "refresh_token": str(refresh),
+                "user": {
+                    "email": user.email,
+                    "first_name": user.first_name,
+                    "last_name": user.last_name,
+                }
+            })
+
+        except SocialApp.DoesNotExist:
+            return JsonResponse(
+                {"error": "Google OAuth configuration not found"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except httpx.HTTPError as e:
+            return JsonResponse(
+                {"error": f"Failed to communicate with Google: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except Exception as e:
+            return JsonResponse(
+                {"error": f"An unexpected error occurred: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -2,6 +2,7 @@
 ASGI config for UserManagement project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+API requests run through API_MIDDLEWARE (see UserManagement.handlers).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,7 +10,7 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from UserManagement.handlers import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UserManagement.settings')
 
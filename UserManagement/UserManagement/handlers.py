@@ -0,0 +1,87 @@
+"""
+WSGI and ASGI applications serving API requests through a lighter
+middleware stack.
+
+Requests whose path starts with API_PATH_PREFIX run through API_MIDDLEWARE;
+everything else (the admin, the allauth browser flows) through MIDDLEWARE.
+"""
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler, get_script_prefix
+from django.core.handlers.wsgi import WSGIHandler, get_path_info
+
+
+def is_api_path(path):
+    return path.startswith(settings.API_PATH_PREFIX)
+
+
+class APIMiddlewareMixin:
+    """
+    Handler building its middleware chain from API_MIDDLEWARE instead of
+    MIDDLEWARE. BaseHandler.load_middleware() reads settings.MIDDLEWARE
+    itself, so the setting is swapped for the duration of that call; it
+    runs once, when the handler is built.
+    """
+    def load_middleware(self, is_async=False):
+        middleware = settings.MIDDLEWARE
+        settings.MIDDLEWARE = settings.API_MIDDLEWARE
+        try:
+            super().load_middleware(is_async)
+        finally:
+            settings.MIDDLEWARE = middleware
+
+
+class APIWSGIHandler(APIMiddlewareMixin, WSGIHandler):
+    pass
+
+
+class APIASGIHandler(APIMiddlewareMixin, ASGIHandler):
+    pass
+
+
+class WSGIDispatcher:
+    """
+    WSGI application handing API requests to the API handler and all
+    other requests to the regular one.
+    """
+    def __init__(self):
+        self.site = WSGIHandler()
+        self.api = APIWSGIHandler()
+
+    def __call__(self, environ, start_response):
+        handler = self.api if is_api_path(get_path_info(environ)) else self.site
+        return handler(environ, start_response)
+
+
+class ASGIDispatcher:
+    """
+    ASGI counterpart of WSGIDispatcher.
+    """
+    def __init__(self):
+        self.site = ASGIHandler()
+        self.api = APIASGIHandler()
+
+    async def __call__(self, scope, receive, send):
+        # The path info, as ASGIRequest derives it
+        path = scope.get('path', '').removeprefix(get_script_prefix(scope))
+        handler = self.api if is_api_path(path) else self.site
+        return await handler(scope, receive, send)
+
+
+def get_wsgi_application():
+    """
+    Same as django.core.wsgi.get_wsgi_application(), with API requests
+    routed through API_MIDDLEWARE.
+    """
+    django.setup(set_prefix=False)
+    return WSGIDispatcher()
+
+
+def get_asgi_application():
+    """
+    Same as django.core.asgi.get_asgi_application(), with API requests
+    routed through API_MIDDLEWARE.
+    """
+    django.setup(set_prefix=False)
+    return ASGIDispatcher()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -47,12 +48,10 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'rest_framework.authtoken',
+    'django_filters',
     
     'User',
 
-    'dj_rest_auth',
-    'dj_rest_auth.registration',
-
     'allauth',
     'allauth.account',
     'allauth.socialaccount',
@@ -61,6 +60,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'User.instrumentation.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,6 +72,17 @@ MIDDLEWARE = [
 
 ]
 
+# Requests under API_PATH_PREFIX (the JWT-only API) run through this stack
+# instead, see UserManagement.handlers: no sessions, CSRF, messages, allauth
+# or clickjacking header. The test client always uses MIDDLEWARE.
+API_PATH_PREFIX = '/api/'
+
+API_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'User.instrumentation.RequestMetricsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
 ROOT_URLCONF = 'UserManagement.urls'
 
 TEMPLATES = [
@@ -95,10 +106,87 @@ WSGI_APPLICATION = 'UserManagement.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE selects the profile: 'sqlite' (default, single node) or 'postgresql'.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'usermanagement'),
+            'USER': os.getenv('DB_USER', ''),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', ''),
+            'PORT': os.getenv('DB_PORT', ''),
+            # Keep connections open across requests; checked before reuse
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    # Connection pooling (psycopg 3 with psycopg_pool). A pool replaces
+    # persistent connections, which Django does not allow alongside it.
+    if os.getenv('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # Reuse connections, so the PRAGMAs below run once per connection
+            # rather than once per request
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'OPTIONS': {
+                # WAL lets readers run alongside the writer; NORMAL syncs on
+                # checkpoints rather than on every commit, which is safe in WAL mode
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+                # Take the write lock at BEGIN, so a transaction that reads
+                # before writing waits for the lock instead of failing with
+                # "database is locked" when it tries to upgrade
+                'transaction_mode': 'IMMEDIATE',
+                # Seconds to wait for the write lock
+                'timeout': float(os.getenv('DB_TIMEOUT', '20')),
+            },
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Token revocation markers, role and group version counters, throttle counters
+# and cached representations live in the cache, so every process serving the
+# site must share it. 'locmem' is private to a process and only suits a single
+# worker. 'file' implements incr and add as a read then a write, so concurrent
+# processes lose version bumps and throttle counts: it only suits a single
+# process that should keep its cache across restarts. Use 'redis' whenever
+# several worker processes serve the site, on one host or many.
+CACHE_BACKEND_CHOICES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000'))},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000'))},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/0'),
+    },
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        **CACHE_BACKEND_CHOICES[CACHE_BACKEND],
+        # Keeps keys apart when several sites share a Redis database
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'usermanagement'),
     }
 }
 
@@ -121,6 +209,25 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# PASSWORD_HASHER picks the hasher for new passwords. The others still verify
+# existing hashes, which are rehashed with the preferred one on the next login.
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'User.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'User.hashers.TunedScryptPasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+]
+
+# Memory-hard parameters: ~19 MiB and a single lane per hash (Django defaults: 100 MiB, 8 lanes)
+ARGON2_PARAMS = {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1}
+# ~16 MiB per hash (Django defaults to a parallelism of 5, i.e. five times the work)
+SCRYPT_PARAMS = {'work_factor': 2**14, 'block_size': 8, 'parallelism': 1}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -155,9 +262,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'User.CustomUser'
 
 REST_FRAMEWORK = {
+    # Use 'User.authentication.StatelessJWTAuthentication' to authorize from
+    # the token claims without selecting the user on every request
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Brute-force limits for the unauthenticated credential endpoints, per
+    # client IP ('login', 'password_reset') and per targeted account
+    # ('login_username', 'password_reset_email'). Set NUM_PROXIES when behind
+    # a reverse proxy, so client IPs are read from X-Forwarded-For.
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '20/min',
+        'login_username': '5/min',
+        'password_reset': '10/hour',
+        'password_reset_email': '3/hour',
+    },
 }
 
 SIMPLE_JWT = {
@@ -186,8 +305,16 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(days=1),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=2),
+
+    'TOKEN_REFRESH_SERIALIZER': 'User.serializers.UserTokenRefreshSerializer',
 }
 
+# Seconds a user's resolved groups/permissions stay in the shared cache (0 disables it)
+ROLE_CACHE_TIMEOUT = 300
+
+# Seconds serialized user and group representations stay in the shared cache (0 disables it)
+REPRESENTATION_CACHE_TIMEOUT = 300
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -199,6 +326,9 @@ EMAIL_HOST_PASSWORD = 'bczn lxqf gjjw xrkr'
 # Frontend URL for password reset
 FRONTEND_URL = 'http://localhost:3000'  # Replace with your frontend URL
 
+# Seconds a password reset token stays valid
+PASSWORD_RESET_TIMEOUT = 60 * 60 * 24
+
 # Login URL
 LOGIN_URL = '/api/auth/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -206,8 +336,6 @@ LOGOUT_REDIRECT_URL = '/'
 
 SITE_ID = 1
 
-import os
-
 ACCOUNT_EMAIL_VERIFICATION = 'none'
 ACCOUNT_SIGNUP_FIELDS = ['email*', 'username*', 'password1*', 'password2*']
 SOCIALACCOUNT_PROVIDERS = {
@@ -222,6 +350,22 @@ SOCIALACCOUNT_PROVIDERS = {
     }
 }
 
+# Google OAuth endpoints and HTTP client tuning
+GOOGLE_OAUTH_AUTH_URL = 'https://accounts.google.com/o/oauth2/v2/auth'
+GOOGLE_OAUTH_TOKEN_URL = 'https://oauth2.googleapis.com/token'
+GOOGLE_OAUTH_USERINFO_URL = 'https://www.googleapis.com/oauth2/v3/userinfo'
+GOOGLE_OAUTH_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+GOOGLE_OAUTH_POOL_SIZE = 10
+GOOGLE_OAUTH_RETRIES = 2
+
+# Request instrumentation: query count and timings as response headers while
+# debugging, and a sampled share of requests aggregated at /api/auth/metrics/
+REQUEST_METRICS_HEADERS = DEBUG
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', '0'))
+
+# Serve login and the Google callback from async views (for ASGI deployments)
+ASYNC_AUTH_VIEWS = os.getenv('ASYNC_AUTH_VIEWS', '').lower() in ('1', 'true', 'yes')
+
 # Fronted URL for google login
 # FRONTEND_URL = "http://localhost:3000/oauth/callback"
 
@@ -2,6 +2,7 @@
 WSGI config for UserManagement project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+API requests run through API_MIDDLEWARE (see UserManagement.handlers).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
@@ -9,7 +10,7 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from UserManagement.handlers import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'UserManagement.settings')
 